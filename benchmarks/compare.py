@@ -0,0 +1,55 @@
+import argparse
+import json
+
+# diff two benchmark result files from benchmarks.run, case by case and stage by stage
+
+def case_key(case):
+    return json.dumps(case['params'], sort_keys=True)
+
+def compare(baseline, candidate):
+    baseline_cases = {case_key(case): case for case in baseline['cases']}
+    rows = []
+    for case in candidate['cases']:
+        base_case = baseline_cases.get(case_key(case))
+        if base_case is None:
+            continue
+        for stage, timing in case['stages'].items():
+            base_timing = base_case['stages'].get(stage)
+            if base_timing is None:
+                continue
+            rows.append({
+                'params': case['params'],
+                'stage': stage,
+                'baseline_s': base_timing['seconds'],
+                'candidate_s': timing['seconds'],
+                'speedup': base_timing['seconds'] / timing['seconds'] if timing['seconds'] else None,
+                'baseline_peak': base_timing.get('peak_bytes'),
+                'candidate_peak': timing.get('peak_bytes')
+            })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    for name, seconds in candidate.get('startup', {}).items():
+        if name in baseline.get('startup', {}):
+            print(f"cold start {name:<10} {baseline['startup'][name]:.3f}s -> {seconds:.3f}s")
+
+    for row in compare(baseline, candidate):
+        params = ', '.join(f"{key}={value}" for key, value in row['params'].items())
+        peak = ""
+        if row['baseline_peak'] and row['candidate_peak']:
+            peak = f"  peak {row['baseline_peak'] / 1e6:.1f} -> {row['candidate_peak'] / 1e6:.1f} MB"
+        print(f"{params} | {row['stage']:<16} {row['baseline_s']:.3f}s -> {row['candidate_s']:.3f}s"
+              f"  x{row['speedup'] or 0:.2f}{peak}")
+
+if __name__ == "__main__":
+    main()
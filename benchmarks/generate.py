@@ -0,0 +1,142 @@
+import argparse
+import json
+from pathlib import Path
+from xml.sax.saxutils import escape
+import numpy as np
+
+# deterministic synthetic ELAN (.eaf) / Label Studio (.json) pairs for benchmarking
+# same parameters and seed always give byte-identical files
+
+STATES = ['stopped', 'visible', 'turning', 'accelerating']
+RELATIONS = ['moving_towards', 'follows', 'overtakes', 'yields_to']
+CATEGORIES = ['action', 'relation']
+
+def entity_names(n_entities):
+    return [f"entity_{i}" for i in range(n_entities)]
+
+def generate_label_studio(duration, fps, n_entities, rng, keyframe_step=10):
+    # videorectangle track per entity, first two keyframes are consecutive frames (fps is derived from them)
+    total_frames = int(duration * fps)
+    keyframes = np.unique(np.r_[1, 2, np.arange(1, total_frames + 1, keyframe_step), total_frames])
+
+    results = []
+    for entity in entity_names(n_entities):
+        # random walk of box position, some keyframes disabled (track gaps)
+        steps = rng.normal(0, 1.5, size=(len(keyframes), 2))
+        xy = np.clip(50 + np.cumsum(steps, axis=0), 0, 90)
+        size = rng.uniform(5, 20, size=2)
+        enabled = rng.random(len(keyframes)) > 0.05
+
+        sequence = [{
+            'frame': int(frame),
+            'enabled': bool(on),
+            'rotation': 0,
+            'x': round(float(x), 4),
+            'y': round(float(y), 4),
+            'width': round(float(size[0]), 4),
+            'height': round(float(size[1]), 4),
+            'time': round((frame - 1) / fps, 6)
+        } for frame, (x, y), on in zip(keyframes, xy, enabled)]
+
+        results.append({
+            'type': 'videorectangle',
+            'meta': {'text': [entity]},
+            'value': {
+                'framesCount': total_frames,
+                'duration': duration,
+                'sequence': sequence,
+                'labels': ['object']
+            }
+        })
+
+    return {'id': 1, 'annotations': [{'id': 1, 'result': results}]}
+
+def annotation_value(entity, entities, category, fanout, rng):
+    # state like stopped(entity_0), or relation like moving_towards(entity_0, [entity_1, entity_2])
+    if category == 'action' or len(entities) < 2:
+        return f"{rng.choice(STATES)}({entity})"
+    others = [other for other in entities if other != entity]
+    objects = list(rng.choice(others, size=min(fanout, len(others)), replace=False))
+    if len(objects) == 1:
+        return f"{rng.choice(RELATIONS)}({entity}, {objects[0]})"
+    return f"{rng.choice(RELATIONS)}({entity}, [{', '.join(objects)}])"
+
+def generate_elan(duration, n_entities, n_tiers, density, fanout, rng, mean_length=2.0):
+    # n_tiers tiers named category(entity), annotations cover about density of each tier timeline
+    entities = entity_names(n_entities)
+    duration_ms = int(duration * 1000)
+    mean_gap = mean_length * (1 - density) / max(density, 1e-6)
+
+    time_slots = []
+    tiers = []
+    for tier_index in range(n_tiers):
+        entity = entities[tier_index % n_entities]
+        category = CATEGORIES[(tier_index // n_entities) % len(CATEGORIES)]
+
+        annotations = []
+        t = rng.exponential(mean_gap) if mean_gap > 0 else 0.0
+        while t < duration:
+            length = rng.exponential(mean_length) + 1 / 30
+            start_ms, end_ms = int(t * 1000), min(int((t + length) * 1000), duration_ms)
+            start_id, end_id = f"ts{len(time_slots) + 1}", f"ts{len(time_slots) + 2}"
+            time_slots.append(f'<TIME_SLOT TIME_SLOT_ID="{start_id}" TIME_VALUE="{start_ms}"/>')
+            time_slots.append(f'<TIME_SLOT TIME_SLOT_ID="{end_id}" TIME_VALUE="{end_ms}"/>')
+
+            value = escape(annotation_value(entity, entities, category, fanout, rng))
+            annotations.append(
+                f'<ANNOTATION><ALIGNABLE_ANNOTATION ANNOTATION_ID="a{len(time_slots) // 2}" '
+                f'TIME_SLOT_REF1="{start_id}" TIME_SLOT_REF2="{end_id}">'
+                f'<ANNOTATION_VALUE>{value}</ANNOTATION_VALUE></ALIGNABLE_ANNOTATION></ANNOTATION>')
+            t += length + (rng.exponential(mean_gap) if mean_gap > 0 else 0.0)
+
+        tiers.append(f'<TIER LINGUISTIC_TYPE_REF="default" TIER_ID="{category}({entity})">\n'
+                     + '\n'.join(annotations) + '\n</TIER>')
+
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<ANNOTATION_DOCUMENT AUTHOR="" FORMAT="3.0" VERSION="3.0">\n'
+            '<HEADER MEDIA_FILE="" TIME_UNITS="milliseconds"/>\n'
+            '<TIME_ORDER>\n' + '\n'.join(time_slots) + '\n</TIME_ORDER>\n'
+            + '\n'.join(tiers) + '\n'
+            '<LINGUISTIC_TYPE GRAPHIC_REFERENCES="false" LINGUISTIC_TYPE_ID="default" TIME_ALIGNABLE="true"/>\n'
+            '</ANNOTATION_DOCUMENT>\n')
+
+def generate_pair(output_dir, name, duration=60.0, fps=30.0, entities=4, tiers=None,
+                  density=0.5, fanout=2, seed=0):
+    # write name.eaf and name.json into output_dir, returns their paths
+    # tiers defaults to one tier per entity
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    json_path = output_dir / f"{name}.json"
+    with open(json_path, 'w') as f:
+        json.dump(generate_label_studio(duration, fps, entities, rng), f)
+
+    xml_path = output_dir / f"{name}.eaf"
+    with open(xml_path, 'w') as f:
+        f.write(generate_elan(duration, entities, tiers or entities, density, fanout, rng))
+
+    return xml_path, json_path
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic EAF/JSON pairs')
+    parser.add_argument('--output', required=True, help='Output directory')
+    parser.add_argument('--name', default='synthetic', help='Base name of the pair')
+    parser.add_argument('--pairs', type=int, default=1, help='Number of pairs (name_0, name_1, ...)')
+    parser.add_argument('--duration', type=float, default=60.0, help='Video duration in seconds')
+    parser.add_argument('--fps', type=float, default=30.0)
+    parser.add_argument('--entities', type=int, default=4)
+    parser.add_argument('--tiers', type=int, default=None, help='ELAN tiers, defaults to one per entity')
+    parser.add_argument('--density', type=float, default=0.5, help='Fraction of each tier covered by annotations')
+    parser.add_argument('--fanout', type=int, default=2, help='Objects per relation annotation')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for i in range(args.pairs):
+        name = args.name if args.pairs == 1 else f"{args.name}_{i}"
+        xml_path, json_path = generate_pair(args.output, name, args.duration, args.fps, args.entities,
+                                            args.tiers, args.density, args.fanout, args.seed + i)
+        print(f"Generated {xml_path} and {json_path}")
+
+if __name__ == "__main__":
+    main()
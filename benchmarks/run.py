@@ -0,0 +1,175 @@
+import argparse
+import itertools
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate import generate_pair
+from src.transform import parse_label_studio_json, parse_elan_xml, process_files
+from src.analyze import analyze_dataset
+from src.render import RenderScheduler
+from src.report import generate_report
+from src.profiling import logger
+
+# scaling matrix, every combination is one benchmark case
+MATRICES = {
+    'small': {
+        'duration': [30, 120],
+        'fps': [30],
+        'entities': [4, 12],
+        # None is one tier per entity, a count above entities gives entities several category tiers
+        'tiers': [None, 24],
+        'density': [0.5],
+        'fanout': [2]
+    },
+    'full': {
+        'duration': [60, 600, 3600],
+        'fps': [30, 60],
+        'entities': [4, 16, 32],
+        'tiers': [None, 64],
+        'density': [0.3, 0.8],
+        'fanout': [1, 3]
+    }
+}
+
+# interpreter cold start: headless (stats mode) imports vs. everything a plotting run loads
+STARTUP_IMPORTS = {
+    'headless': 'import main',
+    'plotting': 'import main, plotly.express, plotly.graph_objects, matplotlib.pyplot, seaborn, networkx'
+}
+
+def measure_startup(repeat=3):
+    # wall time of a fresh interpreter running the imports, fastest of repeat runs
+    root = Path(__file__).resolve().parent.parent
+    startup = {}
+    for name, code in STARTUP_IMPORTS.items():
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], cwd=root, check=True)
+            seconds.append(time.perf_counter() - start)
+        startup[name] = min(seconds)
+        print(f"Cold start {name}: {startup[name]:.3f}s")
+    return startup
+
+def measure(fn, track_memory):
+    # wall time of fn, peak traced memory when track_memory (tracing slows fn down, so it's a separate run)
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+def run_case(params, work_dir, repeat=1, track_memory=True, plots=True):
+    # generate one pair and time every pipeline stage on it
+    xml_path, json_path = generate_pair(work_dir, 'bench', seed=0, **params)
+    output_dir = Path(work_dir) / 'output'
+    output_dir.mkdir(exist_ok=True)
+
+    state = {}
+
+    def parse_json():
+        state['bbox_df'], state['metadata'] = parse_label_studio_json(json_path)
+
+    def parse_eaf():
+        return parse_elan_xml(xml_path, state['metadata']['fps'], state['metadata']['total_frames'])
+
+    def build():
+        state['df'], state['metadata'] = process_files(xml_path, json_path)
+
+    def analyze():
+        state['results'], state['analyzer'] = analyze_dataset(state['df'], state['metadata'])
+
+    def visualize():
+        with RenderScheduler() as scheduler:
+            state['analyzer'].create_static_visualizations(output_dir, scheduler)
+            state['viz_dir'] = state['analyzer'].generate_all_visualizations(output_dir, 'shared', output_dir, scheduler)
+
+    def report():
+        generate_report(state['results'], state.get('viz_dir', output_dir / 'visualizations'), output_dir)
+
+    stages = [('parse_json', parse_json), ('parse_eaf', parse_eaf), ('process_files', build),
+              ('analyze_dataset', analyze)]
+    if plots:
+        stages.append(('visualizations', visualize))
+    stages.append(('generate_report', report))
+
+    timings = {}
+    for name, fn in stages:
+        seconds = []
+        for _ in range(repeat):
+            _, elapsed, _ = measure(fn, False)
+            seconds.append(elapsed)
+        stage = {'seconds': min(seconds), 'seconds_all': seconds}
+        if track_memory:
+            _, _, peak = measure(fn, True)
+            stage['peak_bytes'] = peak
+        timings[name] = stage
+
+    return {
+        'params': params,
+        'inputs': {'eaf_bytes': xml_path.stat().st_size, 'json_bytes': json_path.stat().st_size},
+        'rows': len(state['df']),
+        'stages': timings
+    }
+
+def run_matrix(matrix, repeat=1, track_memory=True, plots=True):
+    keys = list(matrix)
+    cases = []
+    for values in itertools.product(*(matrix[key] for key in keys)):
+        params = dict(zip(keys, values))
+        print(f"Running {params}")
+        with tempfile.TemporaryDirectory() as work_dir:
+            case = run_case(params, work_dir, repeat, track_memory, plots)
+        for name, stage in case['stages'].items():
+            peak = f", peak {stage['peak_bytes'] / 1e6:.1f} MB" if 'peak_bytes' in stage else ""
+            print(f"  {name}: {stage['seconds']:.3f}s{peak}")
+        cases.append(case)
+    return cases
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CVAP pipeline stages on synthetic data')
+    parser.add_argument('--output', required=True, help='JSON file for results')
+    parser.add_argument('--matrix', choices=list(MATRICES), default='small', help='Scaling matrix preset')
+    parser.add_argument('--repeat', type=int, default=1, help='Timing runs per stage, fastest is reported')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc peak memory runs')
+    parser.add_argument('--no-plots', action='store_true', help='Skip the visualization stage')
+    args = parser.parse_args()
+    # pipeline log output is not part of what we want to see (or time) here
+    logger.setLevel(logging.ERROR)
+
+    startup = measure_startup(max(3, args.repeat))
+    cases = run_matrix(MATRICES[args.matrix], args.repeat, not args.no_memory, not args.no_plots)
+    results = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'matrix': args.matrix,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine()
+        },
+        'startup': startup,
+        'cases': cases
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,116 +1,569 @@
 import argparse
+import html
+import json
+import os
+import shutil
+import signal
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
 from pathlib import Path
 import sys
-from src.transform import process_files
-from src.analyze import analyze_dataset
-from src.report import generate_report
+import time
+from src.transform import process_files, parse_elan_xml, memory_report, JOIN_ENGINES
+from src.cache import FrameCache, DEFAULT_CACHE_DIR, file_digest
+from src.analyze import analyze_dataset, PLOTLY_MODES, PLOT_MODULES
+from src.report import generate_report, rerender_report
+from src.export import (write_results, write_frame_table, export_tables, export_video_partitions,
+                        remove_video_partitions, EXPORT_FORMATS, ARROW_FORMATS, DATASET_DIR, pyarrow)
+from src.render import RenderScheduler
+from src.downsample import DEFAULT_MAX_POINTS, DECIMATION_METHODS
+from src.occupancy import DEFAULT_HEATMAP_BINS
+from src.windowed import process_windowed_dataset
+from src.summary import dataset_summary, write_summary, reduce_summaries, write_comparison, COMPARISON_PAGE
+from src.profiling import logger, span, tracer, configure_logging, write_chrome_trace, LOG_LEVELS
 
-def find_file_pairs(input_dir):
-    # get matching pairs of files to combine eaf and json
-    pairs = []
-    xml_files = Path(input_dir).glob("*.eaf")
+def dataset_name(xml_path):
+    # dataset name without .eaf / .eaf.gz extension
+    name = xml_path.name
+    if name.endswith('.gz'):
+        name = name[:-len('.gz')]
+    return Path(name).stem
+
+def relative_dataset_name(xml_path, input_dir):
+    # dataset name of a pair found by --recursive, subdirectories joined with __ (day2/cam.eaf -> day2__cam)
+    return '__'.join(xml_path.parent.relative_to(input_dir).parts + (dataset_name(xml_path),))
+
+def find_file_pairs(input_dir, recursive=False):
+    # get matching pairs of files to combine eaf and json, json next to its eaf
+    # returns {dataset name: (eaf path, json path)} in path order
+    # recursive also searches subdirectories, names include the path relative to input_dir
+    pairs = {}
+    input_dir = Path(input_dir)
+    glob = input_dir.rglob if recursive else input_dir.glob
+    xml_files = sorted(list(glob("*.eaf")) + list(glob("*.eaf.gz")))
     
     for xml_path in xml_files:
-        json_path = xml_path.with_suffix('.json')
-        if json_path.exists():
-            pairs.append((xml_path, json_path))
+        # plain or gzip compressed Label Studio export
+        stem = dataset_name(xml_path)
+        for json_path in (xml_path.with_name(stem + '.json'), xml_path.with_name(stem + '.json.gz')):
+            if json_path.exists():
+                name = relative_dataset_name(xml_path, input_dir)
+                if name in pairs:
+                    # only left for cam.eaf next to cam.eaf.gz (or a__b/c.eaf next to a/b__c.eaf)
+                    logger.warning("Skipping %s, dataset name %s is already used", xml_path, name)
+                    break
+                pairs[name] = (xml_path, json_path)
+                break
     
     return pairs
 
-def process_single_dataset(xml_path, json_path, output_dir):
+def process_single_dataset(xml_path, json_path, output_dir, name=None, cache_dir=None,
+                           plotly_mode='inline', asset_root=None, render_jobs=1,
+                           max_points=DEFAULT_MAX_POINTS, decimation='lttb', report_memory=False,
+                           join_engine='aligned', plots=True, heatmap_bins=DEFAULT_HEATMAP_BINS,
+                           export=None, export_root=None, summary=False, interpolate=False, window_frames=None):
     # dataset processing and report generation function
-    print(f"Processing {xml_path.name} and {json_path.name}")
+    # without plots only results and frame table are written (plotting libraries are never imported)
+    # export - format of exported frame/interval tables, export_root - partitioned dataset across pairs
+    # summary - write mergeable summary.json for the cross dataset comparison
+    # window_frames - without plots, build and analyze the frame table in windows of this many frames
+    # name - dataset name in summaries and export partitions, defaults to the eaf file name
+    # returns report path (results.json without plots) and analysis results
+    logger.info("Processing %s and %s", xml_path.name, json_path.name)
+    name = name or dataset_name(xml_path)
+    
+    if window_frames and not plots:
+        return process_windowed_dataset(xml_path, json_path, output_dir, name, window_frames,
+                                        join_engine, interpolate, export, export_root, summary)
+    
+    # data wrangling from transformation engine package, cached unless cache_dir is None
+    cache = FrameCache(cache_dir) if cache_dir is not None else None
+    df, metadata = process_files(xml_path, json_path, cache, join_engine, interpolate)
+    if report_memory:
+        logger.info("Frame table memory (bytes) for %s:\n%s", xml_path.name, memory_report(df).to_string())
     
-    # data wrangling from transformation engine package
-    df, metadata = process_files(xml_path, json_path)
+    if export:
+        with span('export_tables', format=export):
+            # interval table is not part of the cached frame table, EAF parse is cheap next to the joins
+            # skipped values are already in metadata['parse_errors']
+            intervals = parse_elan_xml(xml_path, metadata['fps'], metadata['total_frames'], errors=[])
+            export_tables(df, intervals, output_dir, export)
+            if export_root is not None:
+                export_video_partitions(df, intervals, export_root, name, export)
     
     # get graphs and charts analysed
-    results, analyzer = analyze_dataset(df, metadata)
+    results, analyzer = analyze_dataset(df, metadata, max_points, decimation, heatmap_bins, cache)
+    if summary:
+        with span('summary'):
+            write_summary(dataset_summary(name, results, analyzer), output_dir)
     
-    # analyzer visualizations
-    viz_dir = analyzer.generate_all_visualizations(output_dir)
-    static_dir = analyzer.create_static_visualizations(output_dir)
+    if not plots:
+        with span('write_stats'):
+            if not export:
+                write_frame_table(df, output_dir)
+            return write_results(results, output_dir), results
+    
+    # kept for --rerender-report-only
+    write_results(results, output_dir)
+    
+    # analyzer visualizations, static plots and figures are render jobs (worker processes with --jobs)
+    # figures and plots whose inputs didn't change since the last run in output_dir are not rendered again
+    analyzer.load_fingerprints(output_dir)
+    with RenderScheduler(render_jobs, PLOT_MODULES) as scheduler:
+        with span('static_plots'):
+            static_dir = analyzer.create_static_visualizations(output_dir, scheduler)
+        with span('visualizations', plotly_mode=plotly_mode):
+            viz_dir = analyzer.generate_all_visualizations(output_dir, plotly_mode, asset_root, scheduler)
+        # renders still running in the workers
+        with span('render_wait', jobs=render_jobs):
+            scheduler.wait()
     
     # final report generation from report generation package
-    report_path = generate_report(results, viz_dir, output_dir)
+    with span('report'):
+        report_path = generate_report(results, viz_dir, output_dir,
+                                      figures=analyzer.figure_json() or None,
+                                      plotly_asset=analyzer.plotly_asset,
+                                      lazy=plotly_mode == 'data')
+    # after the report, which holds the figures in json modes
+    analyzer.save_fingerprints()
     
-    return report_path
+    return report_path, results
+
+def run_dataset_job(name, xml_path, json_path, dataset_dir, options, profile=False):
+    # compare mode job (runs in worker process with --jobs)
+    # returns report path, wall time, trace events and skipped annotation values
+    tracer.enabled = profile
+    tracer.take_events()
+    start = time.perf_counter()
+    try:
+        with span('dataset', dataset=name):
+            report_path, results = process_single_dataset(xml_path, json_path, dataset_dir, name, **options)
+    finally:
+        # events of a failed job are dropped with it
+        events = tracer.take_events()
+    return report_path, time.perf_counter() - start, events, results['parse_errors']
+
+def pair_size(xml_path, json_path):
+    # input size for scheduling, a file gone since discovery counts as 0 and fails in its job
+    size = 0
+    for path in (xml_path, json_path):
+        try:
+            size += path.stat().st_size
+        except OSError:
+            pass
+    return size
+
+def run_compare_jobs(file_pairs, output_dir, jobs=1, options=None, profile=False, on_result=None, executor=None):
+    # process all pairs ({dataset name: (eaf path, json path)}), a failing pair is reported and doesn't stop the others
+    # on_result(name, result) is called as soon as a pair is finished
+    # with jobs > 1 pairs run in executor if one is passed (kept alive by the caller), otherwise in a new pool
+    # larger pairs (by file size) are scheduled first so they don't end up as the tail of the batch
+    ordered_pairs = sorted(file_pairs.items(), key=lambda item: pair_size(*item[1]), reverse=True)
+    options = options or {}
+    results = {}
+    
+    def record(name, job):
+        try:
+            report_path, elapsed, events, parse_errors = job()
+            results[name] = {'report': report_path, 'time': elapsed, 'error': None, 'events': events,
+                             'parse_errors': parse_errors}
+            logger.info("Finished %s in %.2fs", name, elapsed)
+        except Exception as e:
+            results[name] = {'report': None, 'time': None, 'error': f"{type(e).__name__}: {e}", 'events': [],
+                             'parse_errors': []}
+            logger.error("Failed %s: %s", name, results[name]['error'])
+        if on_result is not None:
+            on_result(name, results[name])
+    
+    jobs_args = []
+    for name, (xml_path, json_path) in ordered_pairs:
+        dataset_dir = output_dir / name
+        dataset_dir.mkdir(parents=True, exist_ok=True)
+        jobs_args.append((name, (name, xml_path, json_path, dataset_dir, options, profile)))
+    
+    if jobs <= 1:
+        for name, job_args in jobs_args:
+            record(name, lambda: run_dataset_job(*job_args))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) if executor is None else nullcontext(executor) as pool:
+            futures = {pool.submit(run_dataset_job, *job_args): name for name, job_args in jobs_args}
+            for future in as_completed(futures):
+                record(futures[future], future.result)
+    
+    # keep discovery order for the index
+    return {name: results[name] for name in file_pairs}
+
+def write_index(output_dir, results):
+    # index page linking to all reports, written once all datasets are done
+    index_path = Path(output_dir) / "index.html"
+    with open(index_path, 'w') as f:
+        f.write("""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>Computer Vision Analysis Profiling Tool</title>
+            <style>
+                body { font-family: Arial, sans-serif; margin: 20px; }
+                .report-link { 
+                    display: block;
+                    margin: 10px 0;
+                    padding: 10px;
+                    background: #f5f5f5;
+                    text-decoration: none;
+                    color: #333;
+                }
+                .report-failed { color: #a00; }
+            </style>
+        </head>
+        <body>
+            <h1>Computer Vision Analysis Profiling Tool</h1>
+        """)
+        
+        if (Path(output_dir) / COMPARISON_PAGE).exists():
+            f.write(f'<a class="report-link" href="{COMPARISON_PAGE}"><b>Dataset comparison</b></a>')
+        
+        for name, result in results.items():
+            if result['error'] is None:
+                f.write(f'<a class="report-link" href="{name}/report.html">{name}</a>')
+            else:
+                f.write(f'<div class="report-link report-failed">{name} - failed: {html.escape(result["error"])}</div>')
+        
+        f.write("</body></html>")
+    
+    return index_path
+
+WATCH_MANIFEST = ".cvap_watch.json"
+JOB_MANIFEST = ".cvap_jobs.json"
+
+def write_comparison_page(output_dir, results, link_reports=True):
+    # cross dataset comparison of finished datasets, summaries are reduced one at a time
+    with span('comparison'):
+        aggregate, rows_path = reduce_summaries(output_dir, results)
+        return write_comparison(output_dir, aggregate, rows_path, link_reports)
+
+def rerender_reports(output_dir, mode):
+    # --rerender-report-only: reports of the last run in output_dir again, input files are not read
+    if mode == 'single':
+        logger.info("Report regenerated: %s", rerender_report(output_dir))
+        return
+    
+    manifest = load_manifest(output_dir, JOB_MANIFEST)
+    if not manifest:
+        logger.error("No job manifest (%s) in %s", JOB_MANIFEST, output_dir)
+        sys.exit(1)
+    for name, entry in manifest.items():
+        if entry['status'] != 'done':
+            continue
+        try:
+            rerender_report(Path(output_dir) / name)
+        except (OSError, ValueError) as e:
+            logger.error("Report of %s not regenerated: %s", name, e)
+    logger.info("Index page generated: %s", write_index(output_dir, manifest))
+
+def input_state(path):
+    # cheap change check of an input file, content hash is only computed when this changes
+    stat = Path(path).stat()
+    return {'path': str(path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+def load_manifest(output_dir, manifest_name=WATCH_MANIFEST):
+    manifest_path = Path(output_dir) / manifest_name
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def save_manifest(output_dir, manifest, manifest_name=WATCH_MANIFEST):
+    # temp file + rename so an interrupted run never leaves a broken manifest
+    manifest_path = Path(output_dir) / manifest_name
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def pair_changed(entry, xml_state, json_state):
+    # True if pair is new or its content changed, refreshes stored mtimes for touched but equal files
+    if entry is None:
+        return True
+    for key, state in (('xml', xml_state), ('json', json_state)):
+        stored = entry[key]
+        if stored['path'] != state['path']:
+            return True
+        if (stored['mtime_ns'], stored['size']) != (state['mtime_ns'], state['size']):
+            if file_digest(state['path']) != stored['hash']:
+                return True
+            stored.update(state)
+    return False
+
+def job_entry(xml_path, json_path):
+    # job manifest entry of a discovered pair, status is pending, done or failed
+    return {'xml': input_state(xml_path), 'json': input_state(json_path), 'status': 'pending',
+            'report': None, 'time': None, 'error': None, 'parse_errors': [], 'finished': None}
+
+def job_done(entry, xml_path, json_path):
+    # pair finished in an earlier run on the same input files (path, mtime and size)
+    return (entry is not None and entry['status'] == 'done'
+            and entry['xml'] == input_state(xml_path) and entry['json'] == input_state(json_path))
+
+def run_batch(file_pairs, output_dir, jobs=1, options=None, profile=False, resume=False):
+    # compare/stats run with a job manifest of all discovered pairs in the output dir
+    # every finished pair is recorded right away, --resume skips pairs that are done
+    # returns manifest entries of all pairs and results of the pairs processed in this run
+    previous = load_manifest(output_dir, JOB_MANIFEST) if resume else {}
+    manifest = {}
+    pending = {}
+    for name, (xml_path, json_path) in file_pairs.items():
+        if job_done(previous.get(name), xml_path, json_path):
+            manifest[name] = previous[name]
+        else:
+            manifest[name] = job_entry(xml_path, json_path)
+            pending[name] = (xml_path, json_path)
+    save_manifest(output_dir, manifest, JOB_MANIFEST)
+    if resume:
+        logger.info("Resuming: %d of %d pairs already done", len(file_pairs) - len(pending), len(file_pairs))
+    
+    def record(name, result):
+        manifest[name].update({
+            'status': 'done' if result['error'] is None else 'failed',
+            'report': str(result['report']) if result['report'] is not None else None,
+            'time': result['time'],
+            'error': result['error'],
+            'parse_errors': result['parse_errors'],
+            'finished': time.time()
+        })
+        save_manifest(output_dir, manifest, JOB_MANIFEST)
+    
+    results = run_compare_jobs(pending, output_dir, jobs, options, profile, record)
+    return manifest, results
+
+def ignore_interrupt():
+    # watch pool workers leave Ctrl+C to the watcher, which stops once the running pairs are done
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def watch_compare(input_dir, output_dir, jobs, options, interval=5.0, settle=1.0, recursive=False):
+    # keep reprocessing added/changed pairs, remove outputs of removed pairs, rewrite index page
+    # files modified less than settle seconds ago are picked up in a later round (still being written)
+    # one worker pool for all rounds, workers keep their plotting imports between rounds
+    manifest = load_manifest(output_dir)
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=ignore_interrupt) if jobs > 1 else None
+    logger.info("Watching %s (every %gs, Ctrl+C to stop)", input_dir, interval)
+    
+    try:
+        while True:
+            pairs = find_file_pairs(input_dir, recursive)
+            
+            removed = [name for name in manifest if name not in pairs]
+            for name in removed:
+                logger.info("Removed %s", name)
+                shutil.rmtree(Path(output_dir) / name, ignore_errors=True)
+                if options.get('export_root') is not None:
+                    remove_video_partitions(options['export_root'], name)
+                del manifest[name]
+            
+            changed = {}
+            now = time.time()
+            for name, (xml_path, json_path) in pairs.items():
+                xml_state, json_state = input_state(xml_path), input_state(json_path)
+                if now - max(xml_state['mtime_ns'], json_state['mtime_ns']) / 1e9 < settle:
+                    continue
+                if pair_changed(manifest.get(name), xml_state, json_state):
+                    # hashed before processing, a save during processing shows up as change next round
+                    xml_state['hash'] = file_digest(xml_path)
+                    json_state['hash'] = file_digest(json_path)
+                    changed[name] = (xml_state, json_state)
+            
+            if changed:
+                logger.info("Processing %d new or changed pairs: %s", len(changed), ', '.join(changed))
+                results = run_compare_jobs({name: pairs[name] for name in changed}, output_dir, jobs, options,
+                                           executor=executor)
+                for name, (xml_state, json_state) in changed.items():
+                    result = results[name]
+                    manifest[name] = {
+                        'xml': xml_state,
+                        'json': json_state,
+                        'report': str(result['report']) if result['report'] is not None else None,
+                        'time': result['time'],
+                        'error': result['error'],
+                        'parse_errors': result['parse_errors']
+                    }
+                # a worker that died (e.g. killed for memory) breaks the pool, next round gets a new one
+                if any((result['error'] or '').startswith(BrokenProcessPool.__name__) for result in results.values()):
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=jobs, initializer=ignore_interrupt)
+            
+            if changed or removed:
+                write_comparison_page(output_dir, {name: manifest[name] for name in sorted(manifest)})
+                index_path = write_index(output_dir, {name: manifest[name] for name in sorted(manifest)})
+                save_manifest(output_dir, manifest)
+                logger.info("Index page updated: %s", index_path)
+            
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        save_manifest(output_dir, manifest)
+        logger.info("Stopped watching")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
 
 def main():
     parser = argparse.ArgumentParser(description='Computer Vision Analysis Profiling Tool')
-    parser.add_argument('--mode', choices=['single', 'compare'], required=True,
-                       help='Analysis mode: single dataset or compare multiple')
+    parser.add_argument('--mode', choices=['single', 'compare', 'stats'], required=True,
+                       help='Analysis mode: single dataset, compare multiple, '
+                            'or stats (results.json and frame table per dataset, no plots or report)')
     parser.add_argument('--input', required=True,
                        help='Input directory containing EAF/JSON pairs')
     parser.add_argument('--output', required=True,
                        help='Output directory for report')
+    parser.add_argument('--jobs', type=int, default=1,
+                       help='Number of parallel workers: datasets in compare mode, figure rendering in single mode')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR),
+                       help='Directory for cached frame tables')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Always re-parse input files, do not read or write the cache')
+    parser.add_argument('--max-points', type=int, default=DEFAULT_MAX_POINTS,
+                       help='Point budget per timeline/trajectory figure, 0 keeps full resolution')
+    parser.add_argument('--decimation', choices=DECIMATION_METHODS, default='lttb',
+                       help='Trajectory downsampling method')
+    parser.add_argument('--heatmap-bins', type=int, default=DEFAULT_HEATMAP_BINS,
+                       help='Grid cells per axis of the movement heatmaps')
+    parser.add_argument('--interpolate', action='store_true',
+                       help='Fill bounding boxes between keyframes linearly (like Label Studio), '
+                            'otherwise only keyframes have boxes')
+    parser.add_argument('--join-engine', choices=list(JOIN_ENGINES), default='aligned',
+                       help='aligned: grid offset joins, hash: pandas merges (reference, slower)')
+    parser.add_argument('--export', choices=list(EXPORT_FORMATS),
+                       help='Write frame table and interval table per dataset in this format, '
+                            'compare/stats mode also writes a dataset partitioned by video and entity')
+    parser.add_argument('--window-frames', type=int, default=0,
+                       help='Stats mode: build and analyze the frame table in windows of this many frames, '
+                            'memory follows the window instead of the video length (0 = whole video)')
+    parser.add_argument('--memory-report', action='store_true',
+                       help='Print per column memory of the frame table before and after compact dtypes')
+    parser.add_argument('--plotly-js', choices=PLOTLY_MODES, default='inline',
+                       help='inline: plotly.js embedded in every figure, '
+                            'shared: one plotly.js copy in the output directory, '
+                            'single-file: figures inlined into report.html, '
+                            'data: per entity data files next to report.html, loaded when a tab is opened')
+    
+    parser.add_argument('--rerender-report-only', action='store_true',
+                       help='Regenerate report.html (and the index page in compare mode) from the results '
+                            'and figures of the last run in the output directory, nothing is re-analyzed or re-plotted')
+    
+    parser.add_argument('--watch', action='store_true',
+                       help='Compare mode: keep running and re-report pairs that are added, changed or removed')
+    parser.add_argument('--watch-interval', type=float, default=5.0,
+                       help='Seconds between input directory scans in watch mode')
+    parser.add_argument('--recursive', action='store_true',
+                       help='Also look for EAF/JSON pairs in subdirectories of the input directory')
+    parser.add_argument('--resume', action='store_true',
+                       help='Compare/stats mode: only process pairs the job manifest of the output '
+                            'directory does not list as done (or whose input files changed)')
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default='info',
+                       help='debug adds per stage timings/memory and intermediate table previews')
+    parser.add_argument('--profile', metavar='TRACE_JSON',
+                       help='Write per dataset stage timings and memory as Chrome trace '
+                            '(open in chrome://tracing or ui.perfetto.dev)')
     
     args = parser.parse_args()
+    configure_logging(args.log_level)
+    if args.watch and args.mode != 'compare':
+        parser.error("--watch needs --mode compare")
+    if args.rerender_report_only and (args.mode == 'stats' or args.watch):
+        parser.error("--rerender-report-only needs --mode single or compare (without --watch)")
+    if args.window_frames and args.mode != 'stats':
+        parser.error("--window-frames needs --mode stats")
+    if args.window_frames < 0:
+        parser.error("--window-frames must not be negative")
+    if args.export in ARROW_FORMATS and pyarrow is None:
+        parser.error(f"--export {args.export} needs pyarrow")
     
     # create outpit dir
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
     
+    # per dataset processing options, shared by single and compare mode
+    options = {
+        'cache_dir': None if args.no_cache else Path(args.cache_dir),
+        'plotly_mode': args.plotly_js,
+        'asset_root': output_dir,
+        # compare mode already runs one dataset per worker, figures of a dataset are rendered serially there
+        'render_jobs': args.jobs if args.mode == 'single' or args.jobs <= 1 else 1,
+        'max_points': args.max_points,
+        'decimation': args.decimation,
+        'heatmap_bins': args.heatmap_bins,
+        'report_memory': args.memory_report,
+        'join_engine': args.join_engine,
+        'interpolate': args.interpolate,
+        'plots': args.mode != 'stats',
+        'export': args.export,
+        # the partitioned dataset is across pairs, single mode only writes the per dataset tables
+        'export_root': output_dir / DATASET_DIR if args.export and args.mode != 'single' else None,
+        'summary': args.mode != 'single',
+        'window_frames': args.window_frames
+    }
+    
+    if args.rerender_report_only:
+        rerender_reports(output_dir, args.mode)
+        return
+    
+    if args.watch:
+        if args.profile:
+            parser.error("--profile is not supported with --watch")
+        watch_compare(args.input, output_dir, args.jobs, options, args.watch_interval, recursive=args.recursive)
+        return
+    
     # get input pairs
-    file_pairs = find_file_pairs(args.input)
+    file_pairs = find_file_pairs(args.input, args.recursive)
     if not file_pairs:
-        print(f"No matching XML/JSON pairs found in {args.input}")
+        logger.error("No matching XML/JSON pairs found in %s", args.input)
         sys.exit(1)
     
     if args.mode == 'single':
         if len(file_pairs) > 1:
-            print("Multiple file pairs found. Using the first pair.")
+            logger.warning("Multiple file pairs found. Using the first pair.")
         
-        xml_path, json_path = file_pairs[0]
-        report_path = process_single_dataset(xml_path, json_path, output_dir)
-        print(f"\nReport generated: {report_path}")
+        name, (xml_path, json_path) = next(iter(file_pairs.items()))
+        tracer.enabled = bool(args.profile)
+        with span('dataset', dataset=name):
+            report_path, _ = process_single_dataset(xml_path, json_path, output_dir, name, **options)
+        logger.info("Report generated: %s", report_path)
+        if args.profile:
+            trace_path = write_chrome_trace(args.profile, {name: tracer.take_events()})
+            logger.info("Profile trace written: %s", trace_path)
         
-    else:  # compare mode
-        if len(file_pairs) < 2:
-            print("At least two file pairs needed for comparison mode")
+    else:  # compare and stats mode
+        if args.mode == 'compare' and len(file_pairs) < 2:
+            logger.error("At least two file pairs needed for comparison mode")
             sys.exit(1)
             
-        print(f"Found {len(file_pairs)} file pairs for comparison")
+        logger.info("Found %d file pairs for %s", len(file_pairs),
+                    "comparison" if args.mode == 'compare' else "stats")
         
-        # Process each dataset
-        reports = []
-        for xml_path, json_path in file_pairs:
-            dataset_dir = output_dir / xml_path.stem
-            dataset_dir.mkdir(exist_ok=True)
-            
-            report_path = process_single_dataset(xml_path, json_path, dataset_dir)
-            reports.append((xml_path.stem, report_path))
+        # Process each dataset, pages below are built from the job manifest (includes pairs done in earlier runs)
+        manifest, results = run_batch(file_pairs, output_dir, args.jobs, options, bool(args.profile), args.resume)
         
-        # Generate index page linking to all reports
-        index_path = output_dir / "index.html"
-        with open(index_path, 'w') as f:
-            f.write("""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <title>Computer Vision Analysis Profiling Tool</title>
-                <style>
-                    body { font-family: Arial, sans-serif; margin: 20px; }
-                    .report-link { 
-                        display: block;
-                        margin: 10px 0;
-                        padding: 10px;
-                        background: #f5f5f5;
-                        text-decoration: none;
-                        color: #333;
-                    }
-                </style>
-            </head>
-            <body>
-                <h1>Computer Vision Analysis Profiling Tool</h1>
-            """)
-            
-            for name, report in reports:
-                f.write(f'<a class="report-link" href="{name}/report.html">{name}</a>')
-            
-            f.write("</body></html>")
+        # per pair timings of this run
+        logger.info("Dataset timings:")
+        for name, result in results.items():
+            status = f"{result['time']:.2f}s" if result['error'] is None else "failed"
+            logger.info("  %s: %s", name, status)
+        
+        if args.profile:
+            trace_path = write_chrome_trace(args.profile, {name: result['events'] for name, result in results.items()})
+            logger.info("Profile trace written: %s", trace_path)
         
-        print(f"\nIndex page generated: {index_path}")
+        comparison_path = write_comparison_page(output_dir, manifest, link_reports=args.mode == 'compare')
+        logger.info("Comparison page generated: %s", comparison_path)
+        
+        if args.mode == 'stats':
+            # no index page, a failed dataset fails the run (CI checks)
+            if any(entry['status'] != 'done' for entry in manifest.values()):
+                sys.exit(1)
+            return
+        
+        # Generate index page linking to all reports
+        index_path = write_index(output_dir, manifest)
+        logger.info("Index page generated: %s", index_path)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,55 +1,107 @@
+import os
+import hashlib
+import json
+from functools import lru_cache
+from importlib.metadata import version
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
 from pathlib import Path
-import matplotlib.pyplot as plt
-import seaborn as sns
+from concurrent.futures import Future
+from src.render import RenderScheduler
+from src.profiling import logger, span
+from src.downsample import DEFAULT_MAX_POINTS, frame_runs, segment_coordinates, decimate
+from src.occupancy import DEFAULT_HEATMAP_BINS, bbox_centers, bin_centers, sample_durations, occupancy_grids
+from src.fingerprint import (frame_digest, artifact_fingerprint, load_fingerprints, save_fingerprints,
+                             discard_fingerprints)
+from src.report import FIGURE_JSON_MODES, read_report_figures
 
-class VideoAnalyzer:
-    def __init__(self, df, metadata):
-        self.df = df
-        self.metadata = metadata
-        self.entities = df['entity'].unique()
-        
-    def get_basic_stats(self):
-        # calculating basic video statistics : duration, frame count, number of entities
-        return {
-            'duration': self.metadata['duration'],
-            'total_frames': self.metadata['total_frames'],
-            'fps': self.metadata['fps'],
-            'total_entities': len(self.entities),
-            'annotation_coverage': len(self.df[self.df['has_annotation']]) / len(self.df)
-        }
+# how plotly figures are written:
+# inline - every figure html embeds plotly.js
+# shared - figure html references one plotly.js copy in the output root
+# single-file - no figure html, figures are kept as json and inlined into the report
+# data - figures are kept as json and written into per entity report data files, loaded when a tab is opened
+PLOTLY_MODES = ('inline', 'shared', 'single-file', 'data')
+PLOTLY_ASSET = "plotly.min.js"
 
-    def create_static_visualizations(self, output_dir):
-        # static graphs with matplotlib and seaborn
-        
-        static_dir = Path(output_dir) / "static_plots"
-        static_dir.mkdir(exist_ok=True)
-        
-        # 1. Timeline of annotations per entity
+# frame table columns the movement heatmaps are drawn from, part of their fingerprints
+MOVEMENT_COLUMNS = ['frame', 'bbox_x', 'bbox_y', 'bbox_width', 'bbox_height', 'bbox_enabled']
+# matplotlib pngs of create_static_visualizations, the most render processes a dataset can use
+STATIC_PLOT_COUNT = 3
+
+# plotly, matplotlib and seaborn are imported inside the functions drawing figures,
+# stats-only runs (--mode stats) never load the plotting stacks
+# with render processes they are imported once before the workers are forked
+PLOT_MODULES = ('matplotlib.pyplot', 'seaborn', 'plotly.graph_objects', 'plotly.express')
+
+def write_plotly_asset(output_root):
+    # single plotly.js copy per output root, written once
+    asset_path = Path(output_root) / PLOTLY_ASSET
+    if not asset_path.exists():
+        from plotly.offline import get_plotlyjs
+        # temp file + rename, compare mode workers may race on the same root
+        tmp_path = asset_path.with_name(f"{PLOTLY_ASSET}.{os.getpid()}.tmp")
+        tmp_path.write_text(get_plotlyjs(), encoding='utf-8')
+        os.replace(tmp_path, asset_path)
+    return asset_path
+
+@lru_cache(maxsize=64)
+def graph_layout(nodes, edges):
+    # spring layout of a directed graph given as tuples, cached so identical graphs
+    # (same datasets in compare mode, repeated renders) are laid out once per process
+    import networkx as nx
+    
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from(edges)
+    # fixed seed, identical graphs always get the same picture
+    pos = nx.spring_layout(G, seed=0)
+    return {node: (float(x), float(y)) for node, (x, y) in pos.items()}
+
+def graph_digest(nodes, edges):
+    # layout cache key, networkx version included since spring_layout may change between releases
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(json.dumps([version('networkx'), nodes, edges]).encode())
+    return digest.hexdigest()
+
+def shared_graph_layout(nodes, edges, cache=None):
+    # graph_layout shared through the frame cache dir, so compare mode workers
+    # (separate processes, separate lru caches) lay out each graph once
+    if cache is None:
+        return graph_layout(nodes, edges)
+    key = graph_digest(nodes, edges)
+    pos = cache.load_layout(key)
+    if pos is None:
+        pos = graph_layout(nodes, edges)
+        cache.store_layout(key, pos)
+    return pos
+
+# static plot renderers, module level so they can run in worker processes
+def render_timeline_png(timelines, path, segments=False):
+    # timelines hold per frame timestamps, or NaN separated segment ends when segments is set
+    import matplotlib.pyplot as plt
+    with span('static_timeline'):
         plt.figure(figsize=(15, 8))
-        for i, entity in enumerate(self.entities):
-            entity_df = self.df[self.df['entity'] == entity]
-            plt.plot(entity_df['timestamp'], 
-                    [i] * len(entity_df), 
-                    'o', 
+        for i, (entity, timestamps) in enumerate(timelines):
+            plt.plot(timestamps, 
+                    [i] * len(timestamps), 
+                    '-' if segments else 'o', 
                     label=entity,
-                    alpha=0.5)
-        plt.yticks(range(len(self.entities)), self.entities)
+                    alpha=0.5,
+                    linewidth=8 if segments else None)
+        plt.yticks(range(len(timelines)), [entity for entity, _ in timelines])
         plt.title("Entity Presence Timeline")
         plt.xlabel("Time (seconds)")
         plt.tight_layout()
-        plt.savefig(static_dir / "entity_timeline.png")
+        plt.savefig(path)
         plt.close()
-        
-        # 2. Bounding box trajectories
+
+def render_trajectories_png(trajectories, path):
+    import matplotlib.pyplot as plt
+    with span('static_trajectories'):
         plt.figure(figsize=(10, 10))
-        for entity in self.entities:
-            entity_df = self.df[self.df['entity'] == entity]
-            plt.plot(entity_df['bbox_x'], 
-                    entity_df['bbox_y'], 
+        for entity, xs, ys in trajectories:
+            plt.plot(xs, 
+                    ys, 
                     '-', 
                     label=entity,
                     alpha=0.5)
@@ -58,173 +110,513 @@ class VideoAnalyzer:
         plt.ylabel("Y position")
         plt.legend()
         plt.tight_layout()
-        plt.savefig(static_dir / "trajectories.png")
+        plt.savefig(path)
         plt.close()
-        
-        # 3. State distribution heatmap
-        state_matrix = []
-        for entity in self.entities:
-            entity_df = self.df[self.df['entity'] == entity]
-            state_counts = entity_df['state'].value_counts()
-            state_matrix.append(state_counts)
-        
-        state_df = pd.DataFrame(state_matrix, index=self.entities)
+
+def render_state_heatmap_png(state_df, path):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    with span('static_state_heatmap'):
         plt.figure(figsize=(12, 8))
         sns.heatmap(state_df, annot=True, fmt='g', cmap='YlOrRd')
         plt.title("State Distribution per Entity")
         plt.tight_layout()
-        plt.savefig(static_dir / "state_heatmap.png")
+        plt.savefig(path)
         plt.close()
+
+# plotly figure builders, module level and fed with plain data like the static renderers,
+# figures are built and serialized in render worker processes
+def render_figure(name, build, args, path=None, include_plotlyjs=True):
+    # figure build(*args) as page at path, or its json when path is None (json modes)
+    with span('render_figure', figure=name):
+        fig = build(*args)
+        if path is None:
+            return fig.to_json()
+        fig.write_html(path, include_plotlyjs=include_plotlyjs)
+
+def timeline_figure(traces, segments, height):
+    # traces of (name, x, y), x and y NaN/None separated segments or per frame timestamps and entity labels
+    import plotly.graph_objects as go
+    
+    fig = go.Figure()
+    for name, x, y in traces:
+        if segments:
+            fig.add_trace(go.Scatter(x=x, y=y, mode='lines', name=name, line=dict(width=10)))
+        else:
+            fig.add_trace(go.Scatter(x=x, y=y, mode='markers', name=name, marker=dict(size=5)))
+    
+    fig.update_layout(
+        title="Entity States Timeline",
+        xaxis_title="Time (seconds)",
+        yaxis_title="Entity",
+        height=height
+    )
+    return fig
+
+def state_distribution_figure(entity, counts, states):
+    import plotly.express as px
+    return px.pie(
+        values=counts,
+        names=states,
+        title=f"State Distribution for {entity}"
+    )
+
+def interaction_network_figure(edge_x, edge_y, mid_x, mid_y, hover, node_x, node_y, nodes):
+    import plotly.graph_objects as go
+    
+    edge_trace = go.Scatter(
+        x=edge_x, y=edge_y,
+        line=dict(width=0.5, color='#888'),
+        hoverinfo='none',
+        mode='lines')
+    
+    edge_hover_trace = go.Scatter(
+        x=mid_x, y=mid_y,
+        mode='markers',
+        hoverinfo='text',
+        text=hover,
+        marker=dict(size=6, color='#888'))
+    
+    node_trace = go.Scatter(
+        x=node_x, y=node_y,
+        mode='markers+text',
+        hoverinfo='text',
+        text=nodes,
+        marker=dict(size=20))
+    
+    return go.Figure(data=[edge_trace, edge_hover_trace, node_trace],
+                     layout=go.Layout(
+                         title='Entity Interaction Network',
+                         showlegend=False,
+                         hovermode='closest',
+                         margin=dict(b=20,l=5,r=5,t=40)
+                     ))
+
+def movement_figure(entity, centers, z, customdata):
+    import plotly.graph_objects as go
+    
+    fig = go.Figure(data=go.Heatmap(
+        x=centers,
+        y=centers,
+        z=z,
+        customdata=customdata,
+        hovertemplate="x %{x:.1f}, y %{y:.1f}<br>%{z} boxes<br>dwell %{customdata[0]:.2f}s"
+                      "<br>mean size %{customdata[1]:.1f}<extra></extra>",
+        colorscale='Viridis',
+        colorbar=dict(title="Boxes")
+    ))
+    
+    fig.update_layout(
+        title=f"Movement Heatmap for {entity}",
+        xaxis_title="X position (box center, %)",
+        yaxis_title="Y position (box center, %)",
+        # image coordinates, y grows downwards
+        yaxis=dict(autorange='reversed', scaleanchor='x')
+    )
+    return fig
+
+class VideoAnalyzer:
+    def __init__(self, df, metadata, max_points=DEFAULT_MAX_POINTS, decimation='lttb',
+                 heatmap_bins=DEFAULT_HEATMAP_BINS):
+        self.df = df
+        self.metadata = metadata
+        self.entities = df['entity'].unique().tolist()
+        
+        # point budget per figure for timelines and trajectories, None/0 keeps full resolution
+        self.max_points = max_points
+        self.decimation = decimation
+        # grid size (cells per axis) of movement heatmaps
+        self.heatmap_bins = heatmap_bins
+        
+        # plotly output settings, see generate_all_visualizations
+        self.plotly_mode = 'inline'
+        self.plotly_asset = None
+        self.figures = {}
+        # renders run inline unless a parallel scheduler is passed in
+        # in json modes figures holds the render future of a figure until figure_json is called
+        self.scheduler = RenderScheduler()
+        # frame cache, also stores interaction network layouts (None: layouts cached per process only)
+        self.cache = None
+        
+        # artifact fingerprints (path relative to artifact_root -> fingerprint) of the last run and this run,
+        # only used once load_fingerprints was called
+        self.artifact_root = None
+        self.previous_fingerprints = {}
+        self.previous_figures = {}
+        self.fingerprints = {}
+        self.slice_digests = {}
+        
+        # row positions per entity and per (entity, state), built once instead of boolean scans in every method
+        # label columns are categorical, observed=True skips unused category combinations
+        self.entity_index = df.groupby('entity', sort=False, observed=True).indices
+        self.entity_state_index = df.groupby(['entity', 'state'], sort=False, observed=True).indices
+        self.entity_states = {entity: [] for entity in self.entities}
+        for entity, state in self.entity_state_index:
+            self.entity_states[entity].append(state)
+    
+    def entity_rows(self, entity, columns):
+        # rows of a single entity, only the given columns are copied
+        return self.df.iloc[self.entity_index.get(entity, []), self.df.columns.get_indexer(columns)]
+    
+    def load_fingerprints(self, output_dir):
+        # artifacts of the last complete render in output_dir, unchanged ones are not rendered again
+        # figures of a report rendered in a json mode are read back from it
+        self.artifact_root = Path(output_dir)
+        manifest = load_fingerprints(output_dir)
+        self.previous_fingerprints = manifest.get('artifacts', {})
+        if manifest.get('plotly_mode') in FIGURE_JSON_MODES:
+            try:
+                self.previous_figures = read_report_figures(output_dir, manifest['plotly_mode'])
+            except (OSError, ValueError, IndexError):
+                logger.warning("Figures of the last report in %s can't be read, rendering all of them", output_dir)
+        discard_fingerprints(output_dir)
+    
+    def save_fingerprints(self):
+        # once every render is done, plotly settings are kept for --rerender-report-only
+        plotly_asset = os.path.relpath(self.plotly_asset, self.artifact_root) if self.plotly_asset else None
+        return save_fingerprints(self.artifact_root, {
+            'plotly_mode': self.plotly_mode,
+            'plotly_asset': Path(plotly_asset).as_posix() if plotly_asset else None,
+            'artifacts': self.fingerprints
+        })
+    
+    def slice_digest(self, entity, columns):
+        # content digest of columns of one entity's rows, computed once per analyzer
+        key = (entity, tuple(columns))
+        if key not in self.slice_digests:
+            self.slice_digests[key] = frame_digest(self.entity_rows(entity, list(columns)), list(columns))
+        return self.slice_digests[key]
+    
+    def fingerprint(self, entities, columns, *settings):
+        # fingerprint of an artifact drawn from columns of entities (in drawing order) with given settings
+        if self.artifact_root is None:
+            return None
+        return artifact_fingerprint(tuple((entity, self.slice_digest(entity, columns)) for entity in entities),
+                                    *settings)
+    
+    def reuse_artifact(self, path, fingerprint, available=None):
+        # True if path was made from the same inputs by an earlier run, fingerprint is kept for the next run
+        # available - the earlier artifact is still there, by default path has to exist
+        if fingerprint is None:
+            return False
+        key = Path(path).relative_to(self.artifact_root).as_posix()
+        self.fingerprints[key] = fingerprint
+        if available is None:
+            available = Path(path).exists()
+        if self.previous_fingerprints.get(key) == fingerprint and available:
+            logger.debug("Unchanged %s, not rendered again", key)
+            return True
+        return False
+    
+    def get_basic_stats(self):
+        # calculating basic video statistics : duration, frame count, number of entities
+        return {
+            'duration': self.metadata['duration'],
+            'total_frames': self.metadata['total_frames'],
+            'fps': self.metadata['fps'],
+            'total_entities': len(self.entities),
+            'annotation_coverage': float(self.df['has_annotation'].sum()) / len(self.df)
+        }
+
+    def create_static_visualizations(self, output_dir, scheduler=None):
+        # static graphs with matplotlib and seaborn, each png is rendered as separate job
+        scheduler = scheduler or self.scheduler
+        
+        static_dir = Path(output_dir) / "static_plots"
+        static_dir.mkdir(exist_ok=True)
+        
+        # point budget is shared by the entities of a figure
+        entity_budget = max(2, self.max_points // max(1, len(self.entities))) if self.max_points else None
+        
+        # 1. Timeline of annotations per entity, collapsed to presence segments with a point budget
+        timeline_path = static_dir / "entity_timeline.png"
+        if not self.reuse_artifact(timeline_path, self.fingerprint(self.entities, ['frame', 'timestamp'],
+                                                                   self.max_points, self.metadata['fps'])):
+            timelines = []
+            for entity in self.entities:
+                entity_df = self.entity_rows(entity, ['frame', 'timestamp'])
+                if entity_budget:
+                    starts, ends = frame_runs(entity_df['frame'].to_numpy(), max(1, entity_budget // 3))
+                    x, _ = segment_coordinates(starts, ends, self.metadata['fps'], entity)
+                    timelines.append((entity, x))
+                else:
+                    timelines.append((entity, entity_df['timestamp'].to_numpy()))
+            scheduler.submit_process(render_timeline_png, timelines, timeline_path, bool(entity_budget))
+        
+        # 2. Bounding box trajectories
+        trajectories_path = static_dir / "trajectories.png"
+        # one point per box sample, the line is only broken where a disabled keyframe ends the track
+        if not self.reuse_artifact(trajectories_path, self.fingerprint(self.entities, ['frame', 'bbox_x', 'bbox_y',
+                                                                                       'bbox_enabled'],
+                                                                       self.max_points, self.decimation)):
+            codes, _, rows, boxes = self.box_samples()
+            sample_codes = codes[rows]
+            enabled = self.df['bbox_enabled'].to_numpy(dtype=bool, na_value=True)[rows]
+            categories = self.df['entity'].cat.categories
+            trajectories = []
+            for entity in self.entities:
+                samples = sample_codes == categories.get_loc(entity)
+                xs, ys = decimate(boxes['bbox_x'][samples], boxes['bbox_y'][samples], entity_budget,
+                                  self.decimation, ~enabled[samples])
+                trajectories.append((entity, xs, ys))
+            scheduler.submit_process(render_trajectories_png, trajectories, trajectories_path)
+        
+        # 3. State distribution heatmap
+        heatmap_path = static_dir / "state_heatmap.png"
+        if not self.reuse_artifact(heatmap_path, self.fingerprint(self.entities, ['state'])):
+            state_matrix = []
+            for entity in self.entities:
+                entity_df = self.entity_rows(entity, ['state'])
+                state_counts = entity_df['state'].value_counts()
+                state_counts = state_counts[state_counts > 0]
+                state_matrix.append(state_counts)
+            
+            state_df = pd.DataFrame(state_matrix, index=self.entities)
+            scheduler.submit_process(render_state_heatmap_png, state_df, heatmap_path)
         
         return static_dir
 
     def analyze_entity_states(self, entity):
         # analyzing states for different entities
-        entity_df = self.df[self.df['entity'] == entity]
+        entity_df = self.entity_rows(entity, ['has_annotation', 'category'])
         
-        states = entity_df[entity_df['state'].notna()].groupby('state').size()
-        categories = entity_df[entity_df['category'].notna()].groupby('category').size()
+        states = {state: len(self.entity_state_index[(entity, state)])
+                  for state in sorted(self.entity_states[entity])}
+        categories = entity_df[entity_df['category'].notna()].groupby('category', observed=True).size()
         
         return {
             'total_frames': len(entity_df),
-            'annotated_frames': len(entity_df[entity_df['has_annotation']]),
-            'states': states.to_dict(),
+            'annotated_frames': int(entity_df['has_annotation'].sum()),
+            'states': states,
             'categories': categories.to_dict()
         }
     
+    def figure_path(self, output_dir, name):
+        # figure page, in json modes the figure's place in the report (only a fingerprint key, no file)
+        if self.plotly_mode in FIGURE_JSON_MODES:
+            return Path(output_dir).parent / f"report.html#{name}"
+        return Path(output_dir) / f"{name}.html"
+    
+    def plotly_js_source(self, output_dir):
+        # include_plotlyjs of figure pages, shared mode references the plotly.js copy
+        if self.plotly_mode == 'shared':
+            return Path(os.path.relpath(self.plotly_asset, output_dir)).as_posix()
+        return True
+    
+    def reuse_figure(self, output_dir, name, entities, columns, *settings):
+        # True if the figure is unchanged since the last run, in json modes it is taken over from the last report
+        path = self.figure_path(output_dir, name)
+        fingerprint = self.fingerprint(entities, columns, *settings, self.plotly_mode,
+                                       self.plotly_js_source(output_dir))
+        if self.plotly_mode not in FIGURE_JSON_MODES:
+            return self.reuse_artifact(path, fingerprint)
+        if not self.reuse_artifact(path, fingerprint, name in self.previous_figures):
+            return False
+        self.figures[name] = self.previous_figures[name]
+        return True
+    
+    def submit_figure(self, output_dir, name, build, *args):
+        # render figure build(*args) according to plotly_mode as scheduler job
+        if self.plotly_mode in FIGURE_JSON_MODES:
+            # key is added right away so figure order doesn't depend on render timing
+            self.figures[name] = self.scheduler.submit_process(render_figure, name, build, args)
+            return
+        self.scheduler.submit_process(render_figure, name, build, args, self.figure_path(output_dir, name),
+                                      self.plotly_js_source(output_dir))
+    
+    def figure_json(self):
+        # figure json by name (json modes), only complete after scheduler.wait()
+        return {name: figure.result() if isinstance(figure, Future) else figure
+                for name, figure in self.figures.items()}
+    
     def create_entity_timeline(self, output_dir):
         # create timeline visualization for all entities
-        fig = go.Figure()
+        if self.reuse_figure(output_dir, "entity_timeline", self.entities, ['state', 'frame', 'timestamp'],
+                             self.max_points, self.metadata['fps']):
+            return
+        # with a point budget, state frames are collapsed to segments, budget split across traces
+        segment_budget = max(1, self.max_points // (3 * max(1, len(self.entity_state_index)))) if self.max_points else None
         
+        traces = []
         for entity in self.entities:
-            entity_df = self.df[self.df['entity'] == entity]
-            states = entity_df[entity_df['state'].notna()]['state'].unique()
-            
-            for state in states:
-                state_df = entity_df[entity_df['state'] == state]
-                fig.add_trace(go.Scatter(
-                    x=state_df['timestamp'],
-                    y=[entity] * len(state_df),
-                    mode='markers',
-                    name=f"{entity}-{state}",
-                    marker=dict(size=5)
-                ))
-        
-        fig.update_layout(
-            title="Entity States Timeline",
-            xaxis_title="Time (seconds)",
-            yaxis_title="Entity",
-            height=400 * len(self.entities)
-        )
-        
-        fig.write_html(Path(output_dir) / "entity_timeline.html")
+            for state in self.entity_states[entity]:
+                frames = self.df['frame'].to_numpy()[self.entity_state_index[(entity, state)]]
+                if segment_budget:
+                    starts, ends = frame_runs(frames, segment_budget)
+                    x, y = segment_coordinates(starts, ends, self.metadata['fps'], entity)
+                else:
+                    x = self.df['timestamp'].to_numpy()[self.entity_state_index[(entity, state)]]
+                    y = [entity] * len(x)
+                traces.append((f"{entity}-{state}", x, y))
+        
+        self.submit_figure(output_dir, "entity_timeline", timeline_figure, traces, bool(segment_budget),
+                           400 * len(self.entities))
     
     def create_state_distribution(self, output_dir):
 		# per entity state distribution
         for entity in self.entities:
-            entity_df = self.df[self.df['entity'] == entity]
+            if self.reuse_figure(output_dir, f"state_dist_{entity}", [entity], ['state']):
+                continue
+            entity_df = self.entity_rows(entity, ['state'])
             state_counts = entity_df[entity_df['state'].notna()]['state'].value_counts()
+            state_counts = state_counts[state_counts > 0]
             
-            fig = px.pie(
-                values=state_counts.values,
-                names=state_counts.index,
-                title=f"State Distribution for {entity}"
-            )
-            
-            fig.write_html(Path(output_dir) / f"state_dist_{entity}.html")
+            self.submit_figure(output_dir, f"state_dist_{entity}", state_distribution_figure, entity,
+                               state_counts.to_numpy(), state_counts.index.astype(str).to_numpy())
+    
+    def interaction_edges(self):
+        # (entity, object, state) interaction edges weighted by frame count, duration (s)
+        # and episodes (runs of consecutive frames)
+        keys = ['entity', 'object', 'state']
+        interactions = self.df.loc[self.df['object'].notna(), keys + ['frame']]
+        interactions = interactions.sort_values(keys + ['frame'], kind='stable')
+        
+        # an episode starts at a new edge or after a gap in frames
+        codes = np.column_stack([interactions[key].cat.codes.to_numpy() for key in keys])
+        frames = interactions['frame'].to_numpy()
+        new_edge = np.r_[True, (codes[1:] != codes[:-1]).any(axis=1)]
+        new_episode = new_edge | np.r_[True, np.diff(frames) > 1]
+        
+        edges = (interactions.assign(episode=new_episode)
+                 .groupby(keys, observed=True, dropna=False, sort=False)
+                 .agg(frames=('frame', 'size'), episodes=('episode', 'sum'))
+                 .reset_index())
+        edges['duration'] = edges['frames'] / self.metadata['fps']
+        return edges
     
     def create_interaction_network(self, output_dir):
-        # network graph of entity and object interaction
-        import networkx as nx
-        
-        # create new network
-        G = nx.DiGraph()
-        
-        # add interactions as edges
-        interactions = self.df[self.df['object'].notna()]
-        for _, row in interactions.iterrows():
-            G.add_edge(row['entity'], row['object'], state=row['state'])
-        
-        # convert to plotly figure
-        pos = nx.spring_layout(G)
-        
-        edge_trace = go.Scatter(
-            x=[], y=[],
-            line=dict(width=0.5, color='#888'),
-            hoverinfo='none',
-            mode='lines')
-        
-        node_trace = go.Scatter(
-            x=[], y=[],
-            mode='markers+text',
-            hoverinfo='text',
-            text=[],
-            marker=dict(size=20))
-        
-        for edge in G.edges():
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
-            edge_trace['x'] += (x0, x1, None)
-            edge_trace['y'] += (y0, y1, None)
-        
-        for node in G.nodes():
-            x, y = pos[node]
-            node_trace['x'] += (x,)
-            node_trace['y'] += (y,)
-            node_trace['text'] += (node,)
-        
-        fig = go.Figure(data=[edge_trace, node_trace],
-                     layout=go.Layout(
-                         title='Entity Interaction Network',
-                         showlegend=False,
-                         hovermode='closest',
-                         margin=dict(b=20,l=5,r=5,t=40)
-                     ))
+        # network graph of entity and object interaction, one line per (entity, object) pair,
+        # hover on the line middle lists states with their weights
+        if self.reuse_figure(output_dir, "interaction_network", self.entities, ['object', 'state', 'frame'],
+                             self.metadata['fps']):
+            return
+        
+        edges = self.interaction_edges()
+        edges['entity'] = edges['entity'].astype(str)
+        edges['object'] = edges['object'].astype(str)
+        pairs = edges.groupby(['entity', 'object'], sort=False)
+        
+        # graph as tuples for the cached layout, nodes in order of appearance
+        pair_keys = list(pairs.groups)
+        nodes = tuple(dict.fromkeys(node for pair in pair_keys for node in pair))
+        pos = shared_graph_layout(nodes, tuple(pair_keys), self.cache)
         
-        fig.write_html(Path(output_dir) / "interaction_network.html")
+        # edge segments (start, end, gap) and their midpoints, preallocated
+        n_pairs = len(pair_keys)
+        edge_x = np.full(3 * n_pairs, np.nan)
+        edge_y = np.full(3 * n_pairs, np.nan)
+        mid_x = np.empty(n_pairs)
+        mid_y = np.empty(n_pairs)
+        hover = []
+        for i, ((entity, obj), pair_edges) in enumerate(pairs):
+            (x0, y0), (x1, y1) = pos[entity], pos[obj]
+            edge_x[3 * i:3 * i + 2] = x0, x1
+            edge_y[3 * i:3 * i + 2] = y0, y1
+            mid_x[i], mid_y[i] = (x0 + x1) / 2, (y0 + y1) / 2
+            hover.append(f"{entity} → {obj}<br>" + "<br>".join(
+                f"{state}: {frames} frames, {duration:.1f}s, {episodes} episodes"
+                for state, frames, duration, episodes in pair_edges[['state', 'frames', 'duration', 'episodes']].itertuples(index=False)))
+        
+        node_x = np.array([pos[node][0] for node in nodes])
+        node_y = np.array([pos[node][1] for node in nodes])
+        
+        self.submit_figure(output_dir, "interaction_network", interaction_network_figure,
+                           edge_x, edge_y, mid_x, mid_y, hover, node_x, node_y, list(nodes))
+    
+    def box_samples(self):
+        # bounding boxes with a position, every (entity, frame) once, ordered by entity then frame
+        # returns entity codes and frames of all rows, row positions of the boxes and box columns
+        df = self.df
+        codes = df['entity'].cat.codes.to_numpy().astype(np.int64)
+        frames = df['frame'].to_numpy().astype(np.int64)
+        
+        # frame rows repeat per annotation, keep the first row of every (entity, frame)
+        keys = codes * (int(frames.max(initial=0)) + 1) + frames
+        _, first = np.unique(keys, return_index=True)
+        boxes = {column: df[column].to_numpy(dtype=np.float64, na_value=np.nan)[first]
+                 for column in ('bbox_x', 'bbox_y', 'bbox_width', 'bbox_height')}
+        valid = np.isfinite(boxes['bbox_x']) & np.isfinite(boxes['bbox_y'])
+        rows = first[valid]
+        boxes = {column: values[valid] for column, values in boxes.items()}
+        return codes, frames, rows, boxes
+    
+    def movement_grids(self):
+        # occupancy, dwell time and mean box size per grid cell of box centers, all entities at once
+        # returns dict of [entity code, y bin, x bin] arrays, entity codes follow the entity categories
+        n_entities = len(self.df['entity'].cat.categories)
+        codes, frames, rows, boxes = self.box_samples()
+        
+        cx, cy = bbox_centers(boxes['bbox_x'], boxes['bbox_y'], boxes['bbox_width'], boxes['bbox_height'])
+        # a box is held until the next box of the entity, a disabled keyframe (track ends) for one frame
+        frame_time = 1 / self.metadata['fps']
+        durations = sample_durations(codes[rows], frames[rows] * frame_time, frame_time)
+        enabled = self.df['bbox_enabled'].to_numpy(dtype=bool, na_value=True)[rows]
+        durations = np.where(enabled, durations, frame_time)
+        
+        return occupancy_grids(codes[rows], cx, cy, n_entities, self.heatmap_bins, durations,
+                               boxes['bbox_width'] * boxes['bbox_height'])
     
     def create_bounding_box_movement(self, output_dir):
-        # heatmap of entity movements from bounding box data
-        for entity in self.entities:
-            entity_df = self.df[self.df['entity'] == entity]
-            
-            fig = go.Figure(data=go.Heatmap(
-                x=entity_df['bbox_x'],
-                y=entity_df['bbox_y'],
-                z=entity_df['frame'],
-                colorscale='Viridis'
-            ))
-            
-            fig.update_layout(
-                title=f"Movement Heatmap for {entity}",
-                xaxis_title="X position",
-                yaxis_title="Y position"
-            )
+        # occupancy heatmap of box centers per entity on a fixed grid, dwell time and mean box size on hover
+        # grids are only computed if a figure changed
+        entities = [entity for entity in self.entities
+                    if not self.reuse_figure(output_dir, f"movement_{entity}", [entity], MOVEMENT_COLUMNS,
+                                             self.heatmap_bins, self.metadata['fps'])]
+        if not entities:
+            return
+        
+        grids = self.movement_grids()
+        centers = bin_centers(self.heatmap_bins)
+        categories = list(self.df['entity'].cat.categories)
+        
+        for entity in entities:
+            code = categories.index(entity)
+            occupancy = grids['occupancy'][code]
             
-            fig.write_html(Path(output_dir) / f"movement_{entity}.html")
+            self.submit_figure(output_dir, f"movement_{entity}", movement_figure, entity, centers,
+                               # empty cells stay blank
+                               np.where(occupancy > 0, occupancy, np.nan).astype(np.float32),
+                               np.dstack([grids['dwell'][code], grids['mean_size'][code]]).astype(np.float32))
     
-    def generate_all_visualizations(self, output_dir):
+    def generate_all_visualizations(self, output_dir, plotly_mode='inline', asset_root=None, scheduler=None):
         # generate all visualizations
+        # asset_root is where the shared plotly.js goes, defaults to the visualizations dir
+        # with a parallel scheduler figures are only complete after scheduler.wait()
         output_dir = Path(output_dir) / "visualizations"
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        self.create_entity_timeline(output_dir)
-        self.create_state_distribution(output_dir)
-        self.create_interaction_network(output_dir)
-        self.create_bounding_box_movement(output_dir)
+        self.plotly_mode = plotly_mode
+        self.plotly_asset = write_plotly_asset(asset_root or output_dir) if plotly_mode in ('shared', 'data') else None
+        self.figures = {}
+        if scheduler is not None:
+            self.scheduler = scheduler
+        
+        with span('entity_timeline'):
+            self.create_entity_timeline(output_dir)
+        with span('state_distribution'):
+            self.create_state_distribution(output_dir)
+        with span('interaction_network'):
+            self.create_interaction_network(output_dir)
+        with span('bounding_box_movement'):
+            self.create_bounding_box_movement(output_dir)
         
         return output_dir
 
-def analyze_dataset(df, metadata):
-    # main analysis function
-    analyzer = VideoAnalyzer(df, metadata)
-    
-    results = {
-        'basic_stats': analyzer.get_basic_stats(),
-        'entity_stats': {
-            entity: analyzer.analyze_entity_states(entity)
-            for entity in analyzer.entities
+def analyze_dataset(df, metadata, max_points=DEFAULT_MAX_POINTS, decimation='lttb',
+                    heatmap_bins=DEFAULT_HEATMAP_BINS, cache=None):
+    # main analysis function, cache (FrameCache) is kept for the figures
+    with span('analyze'):
+        analyzer = VideoAnalyzer(df, metadata, max_points, decimation, heatmap_bins)
+        analyzer.cache = cache
+        
+        results = {
+            'basic_stats': analyzer.get_basic_stats(),
+            'entity_stats': {
+                entity: analyzer.analyze_entity_states(entity)
+                for entity in analyzer.entities
+            },
+            # annotation values skipped while parsing the EAF
+            'parse_errors': metadata.get('parse_errors', [])
         }
-    }
     
     return results, analyzer
\ No newline at end of file
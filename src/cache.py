@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+import pandas as pd
+from src.profiling import logger
+
+try:
+    # feather files need pyarrow, without it caching is turned off
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "cvap"
+DEFAULT_MAX_BYTES = 2 * 1024**3
+# temp files this old are left over by a writer that died, younger ones may still be written
+STALE_TMP_SECONDS = 3600
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    # content hash of input file, read in chunks
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class FrameCache:
+    # on-disk cache of final frame tables (feather) and metadata (json)
+    # keyed by content of both input files and transform version, LRU evicted by size
+    # also holds interaction network layouts (json, a few hundred bytes each, not counted to max_bytes)
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.layout_dir = self.cache_dir / "layouts"
+        self.max_bytes = max_bytes
+        self.enabled = pyarrow is not None
+        if not self.enabled:
+            logger.warning("pyarrow not installed, frame table cache disabled")
+            return
+        try:
+            self.layout_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            # unusable cache dir (read-only, path through a file) only costs the cache
+            logger.warning("Cannot create cache dir %s, frame table cache disabled: %s", self.cache_dir, e)
+            self.enabled = False
+
+    def key(self, xml_path, json_path, version, options=None):
+        # cache key out of input contents, transform version and transform options
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(file_digest(xml_path).encode())
+        digest.update(file_digest(json_path).encode())
+        digest.update(str(version).encode())
+        digest.update(json.dumps(options or {}, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def paths(self, key):
+        return self.cache_dir / f"{key}.feather", self.cache_dir / f"{key}.json"
+
+    def load(self, key):
+        # returns (df, metadata) on cache hit, None otherwise
+        if not self.enabled:
+            return None
+        table_path, metadata_path = self.paths(key)
+        if not (table_path.exists() and metadata_path.exists()):
+            return None
+
+        try:
+            df = pd.read_feather(table_path)
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError, pyarrow.ArrowException) as e:
+            logger.warning("Ignoring unreadable cache entry %s: %s", key, e)
+            return None
+
+        # mark as recently used for LRU eviction
+        for path in (table_path, metadata_path):
+            os.utime(path)
+        return df, metadata
+
+    def store(self, key, df, metadata):
+        # a failed write (disk full, read-only cache dir) only costs the cache entry, not the dataset
+        if not self.enabled:
+            return
+        table_path, metadata_path = self.paths(key)
+
+        # write to temporary files and rename, other worker processes may read the same entry
+        tmp_suffix = f".{os.getpid()}.tmp"
+        tmp_table = table_path.with_name(table_path.name + tmp_suffix)
+        tmp_metadata = metadata_path.with_name(metadata_path.name + tmp_suffix)
+        try:
+            df.reset_index(drop=True).to_feather(tmp_table)
+            with open(tmp_metadata, 'w') as f:
+                json.dump(metadata, f)
+            os.replace(tmp_table, table_path)
+            os.replace(tmp_metadata, metadata_path)
+        except (OSError, pyarrow.ArrowException) as e:
+            logger.warning("Not caching frame table %s: %s", key, e)
+            for path in (tmp_table, tmp_metadata):
+                try:
+                    path.unlink(missing_ok=True)
+                except OSError:
+                    pass
+            return
+
+        self.evict()
+
+    def load_layout(self, key):
+        # node positions {node: (x, y)} stored by another run or worker, None if missing
+        if not self.enabled:
+            return None
+        try:
+            with open(self.layout_dir / f"{key}.json") as f:
+                return {node: tuple(xy) for node, xy in json.load(f).items()}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable layout %s: %s", key, e)
+            return None
+
+    def store_layout(self, key, pos):
+        # temp file + rename like frame tables, workers laying out the same graph write identical files
+        if not self.enabled:
+            return
+        layout_path = self.layout_dir / f"{key}.json"
+        tmp_path = layout_path.with_name(layout_path.name + f".{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(pos, f)
+            os.replace(tmp_path, layout_path)
+        except OSError as e:
+            logger.warning("Not caching layout %s: %s", key, e)
+            try:
+                tmp_path.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def evict(self):
+        # drop temp files of dead writers and least recently used entries until cache fits max_bytes
+        stale_before = time.time() - STALE_TMP_SECONDS
+        for tmp_path in self.cache_dir.glob("*.tmp"):
+            try:
+                if tmp_path.stat().st_mtime < stale_before:
+                    tmp_path.unlink()
+            except FileNotFoundError:
+                continue
+
+        entries = []
+        for table_path in self.cache_dir.glob("*.feather"):
+            metadata_path = table_path.with_suffix('.json')
+            try:
+                stat = table_path.stat()
+                size = stat.st_size + (metadata_path.stat().st_size if metadata_path.exists() else 0)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, size, table_path, metadata_path))
+
+        total = sum(size for _, size, _, _ in entries)
+        for _, size, table_path, metadata_path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            for path in (table_path, metadata_path):
+                path.unlink(missing_ok=True)
+            total -= size
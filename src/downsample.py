@@ -0,0 +1,122 @@
+import numpy as np
+
+# default number of points a single figure gets, None/0 means full resolution
+DEFAULT_MAX_POINTS = 5000
+DECIMATION_METHODS = ('lttb', 'minmax')
+
+def frame_runs(frames, max_segments=None):
+    # collapse frame numbers into runs of consecutive frames, returns (run_starts, run_ends) inclusive
+    # with max_segments, runs separated by the smallest gaps are merged until the budget is met
+    frames = np.unique(np.asarray(frames))
+    if len(frames) == 0:
+        return frames, frames
+
+    breaks = np.flatnonzero(np.diff(frames) != 1)
+    if max_segments and len(breaks) + 1 > max_segments:
+        # keep only the largest gaps as run boundaries
+        n_keep = max_segments - 1
+        gaps = frames[breaks + 1] - frames[breaks]
+        keep = np.argpartition(gaps, len(gaps) - n_keep)[len(gaps) - n_keep:] if n_keep else []
+        breaks = np.sort(breaks[keep])
+
+    starts = frames[np.r_[0, breaks + 1]]
+    ends = frames[np.r_[breaks, len(frames) - 1]]
+    return starts, ends
+
+def segment_coordinates(starts, ends, fps, y_value):
+    # line segments for plotting runs, NaN separates segments (start, end, gap)
+    # a run covers its last frame as well, so it ends one frame later
+    x = np.column_stack([starts / fps, (ends + 1) / fps, np.full(len(starts), np.nan)]).ravel()
+    y = np.full(len(x), y_value, dtype=object)
+    y[2::3] = None
+    return x, y
+
+def lttb_indices(x, y, n_out):
+    # largest triangle three buckets, picks n_out points (first and last kept) in index order
+    # works on parametric curves too, triangle area is computed from (x, y) of the points
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.unique([0, n - 1])
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # average of next bucket (or last point) is the third corner
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        bucket_x, bucket_y = x[start:end], y[start:end]
+        area = np.abs((x[prev] - avg_x) * (bucket_y - y[prev]) - (x[prev] - bucket_x) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+
+    return selected
+
+def minmax_indices(x, y, n_out):
+    # per bucket keep the points with min and max y, in index order
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+
+    bucket_size = int(np.ceil(n / max(1, n_out // 2)))
+    n_buckets = int(np.ceil(n / bucket_size))
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, bucket_size)
+
+    offsets = np.arange(n_buckets) * bucket_size
+    mins = offsets + np.nanargmin(buckets, axis=1)
+    maxs = offsets + np.nanargmax(buckets, axis=1)
+    return np.unique(np.concatenate([mins, maxs]))
+
+def decimate(x, y, max_points, method='lttb', track_ends=None):
+    # reduce (x, y) curve to at most max_points points, NaN separators included
+    # samples without a position are left out and the curve is only broken after samples flagged in
+    # track_ends (a track that ends, not a frame without a box), with more breaks than the budget
+    # allows the ones over the longest jumps are kept; segments share the budget by length
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    # a flagged sample without position breaks the curve after the last sample before it
+    last_finite = np.cumsum(finite) - 1
+    x, y = x[finite], y[finite]
+    n = len(x)
+    breaks = np.empty(0, dtype=np.int64)
+    if track_ends is not None:
+        breaks = np.unique(last_finite[np.asarray(track_ends, dtype=bool) & (last_finite >= 0)])
+        breaks = breaks[breaks < n - 1]
+    
+    if not max_points or n + len(breaks) <= max_points:
+        return np.insert(x, breaks + 1, np.nan), np.insert(y, breaks + 1, np.nan)
+    
+    # every segment needs 2 points and a separator
+    max_breaks = max(0, (max_points - 2) // 3)
+    if len(breaks) > max_breaks:
+        jumps = np.hypot(x[breaks + 1] - x[breaks], y[breaks + 1] - y[breaks])
+        breaks = np.sort(breaks[np.argsort(jumps, kind='stable')[len(breaks) - max_breaks:]])
+    
+    starts = np.r_[0, breaks + 1]
+    lengths = np.diff(np.r_[starts, n])
+    spare = max_points - len(breaks) - 2 * len(starts)
+    budgets = np.minimum(lengths, 2 + spare * lengths // n)
+    
+    pick = lttb_indices if method == 'lttb' else minmax_indices
+    parts = []
+    for start, length, budget in zip(starts, lengths, budgets):
+        if budget >= length:
+            parts.append(np.arange(start, start + length))
+        else:
+            parts.append(start + pick(x[start:start + length], y[start:start + length], budget))
+        parts.append(np.array([-1]))
+    
+    indices = np.concatenate(parts[:-1])
+    gap = indices < 0
+    out_x = np.where(gap, np.nan, x[indices])
+    out_y = np.where(gap, np.nan, y[indices])
+    return out_x, out_y
@@ -0,0 +1,132 @@
+import json
+import shutil
+from pathlib import Path
+from urllib.parse import quote
+import numpy as np
+from src.profiling import logger
+
+try:
+    # parquet and feather need pyarrow, without it only csv (and JSON lines) can be written
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# --export formats and their file suffixes
+EXPORT_FORMATS = {'parquet': '.parquet', 'feather': '.feather', 'csv': '.csv'}
+# formats written through pyarrow
+ARROW_FORMATS = ('parquet', 'feather')
+# directory of the partitioned dataset across all pairs (compare and stats mode)
+DATASET_DIR = "dataset"
+
+def json_default(value):
+    # numpy scalars and arrays coming out of pandas aggregations
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def write_results(results, output_dir):
+    # analysis results dict as results.json
+    results_path = Path(output_dir) / "results.json"
+    with open(results_path, 'w') as f:
+        json.dump(results, f, indent=2, default=json_default)
+    return results_path
+
+def write_table(df, path, fmt):
+    # df as path + format suffix, parquet and feather keep the compact dtypes
+    path = Path(path).with_suffix(EXPORT_FORMATS[fmt])
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    elif fmt == 'feather':
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+def write_frame_table(df, output_dir):
+    # final frame table as parquet (dtypes kept), JSON lines when pyarrow is missing
+    if pyarrow is not None:
+        return write_table(df, Path(output_dir) / "frame_table", 'parquet')
+    logger.warning("pyarrow not installed, frame table written as JSON lines")
+    table_path = Path(output_dir) / "frame_table.jsonl"
+    df.to_json(table_path, orient='records', lines=True)
+    return table_path
+
+class TableWriter:
+    # one table file written in parts (windows of the frame table), parts need the same columns and dtypes
+    # parquet through a parquet writer (row group per part), feather as arrow IPC file,
+    # csv and JSON lines (fmt 'jsonl', no pyarrow needed) are appended
+    def __init__(self, path, fmt):
+        self.path = Path(path).with_suffix(EXPORT_FORMATS.get(fmt, '.' + fmt))
+        self.fmt = fmt
+        self.writer = None
+        self.parts = 0
+    
+    def write(self, df):
+        if self.fmt in ARROW_FORMATS:
+            table = pyarrow.Table.from_pandas(df, preserve_index=False)
+            if self.writer is None:
+                if self.fmt == 'parquet':
+                    import pyarrow.parquet as pq
+                    self.writer = pq.ParquetWriter(self.path, table.schema)
+                else:
+                    self.writer = pyarrow.ipc.new_file(self.path, table.schema)
+            self.writer.write_table(table)
+        elif self.fmt == 'csv':
+            df.to_csv(self.path, index=False, mode='a' if self.parts else 'w', header=not self.parts)
+        else:
+            df.to_json(self.path, orient='records', lines=True, mode='a' if self.parts else 'w')
+        self.parts += 1
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def frame_table_writer(output_dir):
+    # frame table written window by window, parquet or JSON lines without pyarrow (see write_frame_table)
+    if pyarrow is not None:
+        return TableWriter(Path(output_dir) / "frame_table", 'parquet')
+    logger.warning("pyarrow not installed, frame table written as JSON lines")
+    return TableWriter(Path(output_dir) / "frame_table", 'jsonl')
+
+def export_tables(df, intervals, output_dir, fmt):
+    # per dataset frame table and interval level annotation table
+    return (write_table(df, Path(output_dir) / "frame_table", fmt),
+            write_table(intervals, Path(output_dir) / "intervals", fmt))
+
+def partition_dir(root, column, value):
+    # hive style directory (column=value), value url-quoted like pyarrow expects
+    return Path(root) / f"{column}={quote(str(value), safe='')}"
+
+def write_partitions(df, root, fmt, column, part=0):
+    # one file per value of column under root/column=value/, column itself is in the path only
+    # part numbers the files of a partition written in several windows
+    paths = []
+    for value, part_df in df.groupby(column, observed=True, sort=False):
+        part_dir = partition_dir(root, column, value)
+        part_dir.mkdir(parents=True, exist_ok=True)
+        paths.append(write_table(part_df.drop(columns=column), part_dir / f"part-{part}", fmt))
+    return paths
+
+def remove_video_partitions(dataset_root, video):
+    # drop everything a previous run wrote for video
+    for table in ('frames', 'intervals'):
+        shutil.rmtree(partition_dir(Path(dataset_root) / table, 'video', video), ignore_errors=True)
+
+def export_video_partitions(df, intervals, dataset_root, video, fmt):
+    # adds one video to the dataset partitioned by video and entity:
+    # dataset_root/{frames,intervals}/video=<name>/entity=<name>/part-0.<fmt>
+    # every pair only touches its own video partition, so compare mode workers can write in parallel
+    remove_video_partitions(dataset_root, video)
+    for table, table_df in (('frames', df), ('intervals', intervals)):
+        video_dir = partition_dir(Path(dataset_root) / table, 'video', video)
+        write_partitions(table_df, video_dir, fmt, 'entity')
+    return Path(dataset_root)
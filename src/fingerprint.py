@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import pandas as pd
+
+# fingerprints of the rendered artifacts (figures and static plots) of a dataset output dir
+# an artifact is only rendered again when the frame table slice it is drawn from,
+# its render settings or RENDERER_VERSION changed since the run that wrote it
+
+# bump when figure code changes, every artifact is rendered again
+RENDERER_VERSION = 1
+FINGERPRINT_FILE = "fingerprints.json"
+
+def frame_digest(df, columns):
+    # content hash of columns of df, categoricals are hashed by label so unrelated categories don't matter
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(df[columns], index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def artifact_fingerprint(*parts):
+    # fingerprint out of slice digests and render settings, parts are plain values with a stable repr
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((RENDERER_VERSION,) + parts).encode())
+    return digest.hexdigest()
+
+def load_fingerprints(output_dir):
+    # fingerprint manifest of the last complete render in output_dir, empty if there is none
+    try:
+        with open(Path(output_dir) / FINGERPRINT_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_fingerprints(output_dir, manifest):
+    # temp file + rename like the job manifest
+    manifest_path = Path(output_dir) / FINGERPRINT_FILE
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
+
+def discard_fingerprints(output_dir):
+    # dropped while a render runs, artifacts of an interrupted render are never taken as up to date
+    (Path(output_dir) / FINGERPRINT_FILE).unlink(missing_ok=True)
@@ -0,0 +1,50 @@
+import numpy as np
+
+# bins per axis of movement heatmaps, figures have bins x bins cells whatever the video length
+DEFAULT_HEATMAP_BINS = 50
+# Label Studio boxes are in percent of the video frame
+FRAME_EXTENT = (0.0, 100.0)
+
+def bbox_centers(x, y, width, height):
+    # center of boxes given by top left corner and size
+    return x + width / 2, y + height / 2
+
+def cell_index(values, bins, extent=FRAME_EXTENT):
+    # bin of every value on a regular grid over extent, values outside go to the edge bins
+    low, high = extent
+    scaled = np.floor((values - low) * (bins / (high - low)))
+    return np.clip(scaled, 0, bins - 1).astype(np.int64)
+
+def bin_centers(bins, extent=FRAME_EXTENT):
+    low, high = extent
+    return low + (np.arange(bins) + 0.5) * (high - low) / bins
+
+def sample_durations(groups, times, default):
+    # seconds from each sample to the next sample of the same group, rows sorted by (group, time)
+    # last sample of a group gets default
+    durations = np.full(len(times), default, dtype=np.float64)
+    if len(times) > 1:
+        same_group = groups[1:] == groups[:-1]
+        durations[:-1] = np.where(same_group, np.diff(times), default)
+    return durations
+
+def binned_sums(groups, cx, cy, n_groups, bins, weights=None, extent=FRAME_EXTENT):
+    # one bincount over all groups, returns array [group, y bin, x bin]
+    # counts samples per cell, sums weights instead when given
+    flat = (groups * bins + cell_index(cy, bins, extent)) * bins + cell_index(cx, bins, extent)
+    sums = np.bincount(flat, weights=weights, minlength=n_groups * bins * bins)
+    return sums.reshape(n_groups, bins, bins)
+
+def occupancy_grids(groups, cx, cy, n_groups, bins=DEFAULT_HEATMAP_BINS, durations=None, sizes=None,
+                    extent=FRAME_EXTENT):
+    # occupancy (samples per cell) and optionally dwell time (sum of durations, seconds)
+    # and mean box size per cell for every group in one pass over the samples
+    # mean size is NaN for empty cells
+    grids = {'occupancy': binned_sums(groups, cx, cy, n_groups, bins, extent=extent)}
+    if durations is not None:
+        grids['dwell'] = binned_sums(groups, cx, cy, n_groups, bins, durations, extent)
+    if sizes is not None:
+        size_sums = binned_sums(groups, cx, cy, n_groups, bins, sizes, extent)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            grids['mean_size'] = size_sums / grids['occupancy']
+    return grids
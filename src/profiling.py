@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("cvap")
+
+LOG_LEVELS = ('debug', 'info', 'warning', 'error')
+
+def configure_logging(level='info'):
+    # plain message output, level picked with --log-level
+    logging.basicConfig(format='%(message)s', level=getattr(logging, level.upper()))
+
+def current_rss():
+    # resident memory of this process in bytes (/proc on Linux, peak RSS elsewhere)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS
+        return peak if peak > 1 << 32 else peak * 1024
+
+class Tracer:
+    # timing and memory spans around pipeline stages
+    # spans are always logged at debug level, events are only kept while enabled (--profile)
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter_ns()
+        rss_before = current_rss()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            rss_after = current_rss()
+            logger.debug("[%s] %.3fs, rss %.1f MB (%+.1f MB)", name, (end - start) / 1e9,
+                         rss_after / 1e6, (rss_after - rss_before) / 1e6)
+            if self.enabled:
+                self.add_span(name, start, end, rss_before, rss_after, args)
+
+    def add_span(self, name, start, end, rss_before, rss_after, args):
+        # complete event plus memory counter in chrome trace format (timestamps in microseconds)
+        pid, tid = os.getpid(), threading.get_ident()
+        with self.lock:
+            self.events.append({
+                'name': name, 'cat': 'stage', 'ph': 'X',
+                'ts': start / 1000, 'dur': (end - start) / 1000,
+                'pid': pid, 'tid': tid,
+                'args': {**args, 'rss_before_mb': round(rss_before / 1e6, 2),
+                         'rss_after_mb': round(rss_after / 1e6, 2)}
+            })
+            self.events.append({
+                'name': 'rss', 'ph': 'C', 'ts': end / 1000, 'pid': pid,
+                'args': {'MB': round(rss_after / 1e6, 2)}
+            })
+
+    def add_events(self, events):
+        # events recorded in another process (render workers)
+        with self.lock:
+            self.events.extend(events)
+
+    def take_events(self):
+        # events recorded so far, tracer starts over
+        with self.lock:
+            events, self.events = self.events, []
+        return events
+
+tracer = Tracer()
+span = tracer.span
+
+def write_chrome_trace(path, dataset_events):
+    # one trace file, every dataset is shown as its own process track named after the dataset
+    trace_events = []
+    for track, (name, events) in enumerate(dataset_events.items(), start=1):
+        trace_events.append({'name': 'process_name', 'ph': 'M', 'pid': track, 'args': {'name': name}})
+        for event in events:
+            trace_events.append({**event, 'pid': track})
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+    return path
@@ -0,0 +1,74 @@
+from concurrent.futures import ProcessPoolExecutor, Future
+from importlib import import_module
+from src.profiling import tracer
+
+def run_traced(fn, profile, args):
+    # worker process side of submit_process, spans of fn are sent back with its result
+    # the tracer is emptied first, forked workers start with a copy of the parent events
+    tracer.enabled = profile
+    tracer.take_events()
+    result = fn(*args)
+    return result, tracer.take_events()
+
+class RenderScheduler:
+    # dispatches independent figure renders (matplotlib plots and plotly figures) to worker processes,
+    # renders get plain data and build their figure in the worker, savefig and plotly serialization hold the GIL
+    # preload - modules imported in this process before the workers are forked, so they are imported once
+    # with jobs <= 1 every render runs inline, in submission order
+    def __init__(self, jobs=1, preload=()):
+        self.jobs = jobs
+        self.preload = preload
+        self.futures = []
+        self.process_pool = None
+
+    def run_inline(self, fn, args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def submit_process(self, fn, *args):
+        # fn and args need to be picklable (module level function, plain data)
+        if self.jobs <= 1:
+            return self.run_inline(fn, args)
+        if self.process_pool is None:
+            for module in self.preload:
+                import_module(module)
+            self.process_pool = ProcessPoolExecutor(max_workers=self.jobs)
+        # worker spans go into this process' tracer so --profile shows them
+        future = Future()
+        self.process_pool.submit(run_traced, fn, tracer.enabled, args).add_done_callback(
+            lambda traced: self.finish_traced(traced, future))
+        self.futures.append(future)
+        return future
+
+    def finish_traced(self, traced, future):
+        error = traced.exception()
+        if error is not None:
+            future.set_exception(error)
+            return
+        result, events = traced.result()
+        tracer.add_events(events)
+        future.set_result(result)
+
+    def wait(self):
+        # wait for every submitted render, first error is raised once all are done
+        futures, self.futures = self.futures, []
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def shutdown(self):
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+        self.process_pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.wait()
+        finally:
+            self.shutdown()
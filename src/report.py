@@ -1,13 +1,106 @@
+import html
+import json
+import os
+import re
 from jinja2 import Template
 from pathlib import Path
+from src.export import json_default
+from src.fingerprint import load_fingerprints, FINGERPRINT_FILE
+
+# modes keeping figures as json in the report (inlined in single-file, in the data files in data mode)
+# figures of these modes have no file of their own, unchanged ones are read back from the report
+FIGURE_JSON_MODES = ('single-file', 'data')
+# figures of the report sections outside of the entity tabs
+OVERVIEW_FIGURES = ('entity_timeline', 'interaction_network')
+# inlined figure in a single-file report, see the figure macro
+INLINE_FIGURE = re.compile(r'<div class="plotly-figure" data-name="([^"]*)" data-figure="([^"]*)"></div>')
+
+def write_data_file(path, key, stats, figures):
+    # report data file, a script that hands stats and figure specs (plotly json) to the page
+    # loaded with a script tag so it also works for reports opened from disk (file://)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"cvapData({json.dumps(key)}, {{\"stats\": {json.dumps(stats, default=json_default)}, \"figures\": {{")
+        f.write(",".join(f"{json.dumps(name)}: {spec}" for name, spec in figures.items()))
+        f.write("}});\n")
+    return path
+
+def read_data_figures(path):
+    # figure json of a data file written by write_data_file, as written (not parsed and dumped again)
+    text = Path(path).read_text(encoding='utf-8')
+    decoder = json.JSONDecoder()
+    _, pos = decoder.raw_decode(text, len('cvapData('))
+    _, pos = decoder.raw_decode(text, pos + len(', {"stats": '))
+    pos += len(', "figures": {')
+    figures = {}
+    while text[pos] != '}':
+        name, pos = decoder.raw_decode(text, pos)
+        start = pos + len(': ')
+        _, pos = decoder.raw_decode(text, start)
+        figures[name] = text[start:pos]
+        pos += text[pos] == ','
+    return figures
+
+def read_report_figures(output_dir, plotly_mode):
+    # figure json of the report in output_dir rendered in plotly_mode (one of FIGURE_JSON_MODES)
+    output_dir = Path(output_dir)
+    if plotly_mode == 'data':
+        figures = {}
+        for path in sorted((output_dir / "data").glob("*.js")):
+            figures.update(read_data_figures(path))
+        return figures
+    text = (output_dir / "report.html").read_text(encoding='utf-8')
+    return {name: html.unescape(spec) for name, spec in INLINE_FIGURE.findall(text)}
+
+def write_report_data(results, output_dir, figures):
+    # one data file per entity (its stats and figures) and one for the overview figures
+    # returns data file per key and the key of every entity
+    # data files of an earlier report are removed, the next run reads its figures back from this one
+    data_dir = Path(output_dir) / "data"
+    data_dir.mkdir(exist_ok=True)
+    for path in data_dir.glob("*.js"):
+        path.unlink()
+    
+    data_files = {}
+    entity_keys = {}
+    for i, (entity, stats) in enumerate(results['entity_stats'].items()):
+        key = f"entity_{i}"
+        entity_keys[entity] = key
+        entity_figures = {name: figures[name] for name in (f"state_dist_{entity}", f"movement_{entity}")
+                          if figures.get(name)}
+        write_data_file(data_dir / f"{key}.js", key, stats, entity_figures)
+        data_files[key] = f"data/{key}.js"
+    
+    overview_figures = {name: figures[name] for name in OVERVIEW_FIGURES if figures.get(name)}
+    write_data_file(data_dir / "overview.js", "overview", results['basic_stats'], overview_figures)
+    data_files['overview'] = "data/overview.js"
+    return data_files, entity_keys
 
 # report template 
-def generate_report(results, viz_dir, output_dir):
+def generate_report(results, viz_dir, output_dir, figures=None, plotly_asset=None, lazy=False):
+    # figures - plotly figures as json (single-file and data mode), rendered into the page instead of iframes
+    # plotly_asset - shared plotly.js copy referenced by the figures (shared and data mode)
+    # lazy - figures and stats go to per entity data files, a tab's data is only loaded when it's opened
     template = """
+    {% macro figure(name, height) %}
+        {% if lazy %}
+        <div class="plotly-figure" data-name="{{ name }}" style="height: {{ height }}"></div>
+        {% elif figures %}
+        <div class="plotly-figure" data-name="{{ name }}" data-figure="{{ figures[name]|e }}"></div>
+        {% else %}
+        <iframe src="visualizations/{{ name }}.html" width="100%" height="{{ height }}"></iframe>
+        {% endif %}
+    {% endmacro %}
     <!DOCTYPE html>
     <html>
     <head>
         <title>CVAP Tool</title>
+        {% if figures %}
+        <script>{{ plotly_js }}</script>
+        {% elif lazy %}
+        <script src="{{ plotly_asset }}" defer></script>
+        {% elif plotly_asset %}
+        <link rel="preload" href="{{ plotly_asset }}" as="script">
+        {% endif %}
         <style>
             body { font-family: Arial, sans-serif; margin: 20px; }
             .section { margin: 20px 0; padding: 20px; border: 1px solid #ddd; }
@@ -55,15 +148,18 @@ def generate_report(results, viz_dir, output_dir):
             </div>
             
             {% for entity in entities %}
-            <div id="{{ entity }}" class="tab-content">
+            <div id="{{ entity }}" class="tab-content"{% if lazy %} data-key="{{ entity_keys[entity] }}"{% endif %}>
                 <h3>{{ entity }} Statistics</h3>
+                {% if lazy %}
+                <div class="stats entity-stats"></div>
+                {% endif %}
                 <div class="visualization">
                     <h4>State Distribution</h4>
-                    <iframe src="visualizations/state_dist_{{ entity }}.html" width="100%" height="400px"></iframe>
+                    {{ figure('state_dist_' ~ entity, '400px') }}
                 </div>
                 <div class="visualization">
                     <h4>Movement Heatmap</h4>
-                    <iframe src="visualizations/movement_{{ entity }}.html" width="100%" height="400px"></iframe>
+                    {{ figure('movement_' ~ entity, '400px') }}
                 </div>
                 <div class="visualization">
                     <h4>Static Visualizations</h4>
@@ -73,21 +169,73 @@ def generate_report(results, viz_dir, output_dir):
             {% endfor %}
         </div>
 
-        <div class="section">
+        <div class="section"{% if lazy %} data-key="overview"{% endif %}>
             <h2>Timeline Analysis</h2>
             <div class="visualization">
-                <iframe src="visualizations/entity_timeline.html" width="100%" height="600px"></iframe>
+                {{ figure('entity_timeline', '600px') }}
             </div>
         </div>
 
-        <div class="section">
+        <div class="section"{% if lazy %} data-key="overview"{% endif %}>
             <h2>Interaction Network</h2>
             <div class="visualization">
-                <iframe src="visualizations/interaction_network.html" width="100%" height="600px"></iframe>
+                {{ figure('interaction_network', '600px') }}
             </div>
         </div>
 
         <script>
+            {% if lazy %}
+            // data files are loaded on first use, each one calls cvapData(key, data)
+            const dataFiles = {{ data_files|tojson }};
+            const pending = {};
+            const requests = {};
+            function cvapData(key, data) {
+                pending[key](data);
+            }
+            
+            function loadData(key) {
+                if (!requests[key]) {
+                    requests[key] = new Promise(resolve => {
+                        pending[key] = resolve;
+                        const script = document.createElement('script');
+                        script.src = dataFiles[key];
+                        document.head.appendChild(script);
+                    });
+                }
+                return requests[key];
+            }
+            
+            function renderData(container) {
+                // stats and figures of a section or tab, drawn once
+                loadData(container.dataset.key).then(data => {
+                    const stats = container.querySelector('.entity-stats:not(.rendered)');
+                    if (stats) {
+                        const states = Object.entries(data.stats.states || {});
+                        stats.innerHTML = [['Total Frames', data.stats.total_frames],
+                                           ['Annotated Frames', data.stats.annotated_frames]]
+                            .concat(states.map(([state, frames]) => [state, frames]))
+                            .map(([label, value]) => `<div class="stat-card"><h3>${label}</h3><p>${value}</p></div>`)
+                            .join('');
+                        stats.classList.add('rendered');
+                    }
+                    container.querySelectorAll('.plotly-figure:not(.rendered)').forEach(div => {
+                        const spec = data.figures[div.dataset.name];
+                        if (spec) Plotly.newPlot(div, spec.data, spec.layout, {responsive: true});
+                        div.classList.add('rendered');
+                    });
+                });
+            }
+            {% endif %}
+            
+            function renderFigures(container) {
+                // draw inlined figures of a container once it is visible
+                container.querySelectorAll('.plotly-figure:not(.rendered)').forEach(div => {
+                    const spec = JSON.parse(div.dataset.figure);
+                    Plotly.newPlot(div, spec.data, spec.layout, {responsive: true});
+                    div.classList.add('rendered');
+                });
+            }
+            
             function showTab(entityId) {
                 // Hide all tab contents
                 document.querySelectorAll('.tab-content').forEach(content => {
@@ -95,6 +243,11 @@ def generate_report(results, viz_dir, output_dir):
                 });
                 // Show selected tab content
                 document.getElementById(entityId).style.display = 'block';
+                {% if lazy %}
+                renderData(document.getElementById(entityId));
+                {% elif figures %}
+                renderFigures(document.getElementById(entityId));
+                {% endif %}
                 // Update active tab
                 document.querySelectorAll('.tab').forEach(tab => {
                     tab.classList.remove('active');
@@ -102,26 +255,64 @@ def generate_report(results, viz_dir, output_dir):
                 document.querySelector(`[onclick="showTab('${entityId}')"]`).classList.add('active');
             }
             
-            // Show first tab by default
-            showTab('{{ entities[0] }}');
+            // Show first tab by default, once deferred plotly.js is loaded
+            document.addEventListener('DOMContentLoaded', () => {
+                showTab('{{ entities[0] }}');
+                {% if lazy %}
+                document.querySelectorAll('.section[data-key]').forEach(renderData);
+                {% elif figures %}
+                document.querySelectorAll('.section').forEach(section => {
+                    if (!section.querySelector('.tab-content')) renderFigures(section);
+                });
+                {% endif %}
+            });
         </script>
     </body>
     </html>
     """
     
-    # prepare template data
+    data_files = entity_keys = None
+    if lazy:
+        data_files, entity_keys = write_report_data(results, output_dir, figures or {})
+        figures = None
+    
+    # prepare template data, plotly.js only needed (and imported) for inlined figures
+    plotly_js = None
+    if figures:
+        from plotly.offline import get_plotlyjs
+        plotly_js = get_plotlyjs()
     template_data = {
         'basic_stats': results['basic_stats'],
         'entities': list(results['entity_stats'].keys()),
-        'viz_dir': viz_dir
+        'viz_dir': viz_dir,
+        'figures': figures,
+        'plotly_js': plotly_js,
+        'plotly_asset': Path(os.path.relpath(plotly_asset, output_dir)).as_posix() if plotly_asset else None,
+        'lazy': lazy,
+        'data_files': data_files,
+        'entity_keys': entity_keys
     }
     
-    # generate report
-    report_html = Template(template).render(**template_data)
-    
-    # write report to file
+    # generate report, streamed straight into the file instead of building the page as one string
     report_path = Path(output_dir) / "report.html"
-    with open(report_path, 'w') as f:
-        f.write(report_html)
+    Template(template).stream(**template_data).dump(str(report_path), encoding='utf-8')
+    
+    return report_path
+
+def rerender_report(output_dir):
+    # report.html of a rendered dataset dir again, out of results.json and the figures the last run left
+    # (--rerender-report-only), no figure or plot is touched
+    output_dir = Path(output_dir)
+    manifest = load_fingerprints(output_dir)
+    if not manifest:
+        raise FileNotFoundError(f"No complete render in {output_dir} ({FINGERPRINT_FILE} missing)")
+    with open(output_dir / "results.json") as f:
+        results = json.load(f)
+    
+    plotly_mode = manifest['plotly_mode']
+    figures = read_report_figures(output_dir, plotly_mode) if plotly_mode in FIGURE_JSON_MODES else None
+    plotly_asset = output_dir / manifest['plotly_asset'] if manifest['plotly_asset'] else None
     
-    return report_path
\ No newline at end of file
+    return generate_report(results, output_dir / "visualizations", output_dir, figures=figures,
+                           plotly_asset=plotly_asset, lazy=plotly_mode == 'data')
+
@@ -0,0 +1,207 @@
+import csv
+import html
+import json
+from collections import Counter
+from pathlib import Path
+import numpy as np
+from src.export import json_default
+
+# mergeable per dataset summaries for compare mode
+# every summary is a few counters, datasets are reduced one at a time into a running aggregate
+# and the per dataset rows are streamed to csv, memory does not grow with the number of videos
+
+SUMMARY_FILE = "summary.json"
+COMPARISON_ROWS = "comparison.csv"
+COMPARISON_PAGE = "comparison.html"
+
+# box size histogram over sqrt(width * height), percent of the frame side
+BBOX_SIZE_EDGES = np.linspace(0, 100, 21)
+# finer histogram the median box size is read from, every BBOX_SIZE_EDGES bin split into 50 (0.1 % bins)
+# it adds up over windows, no box sizes are kept per dataset
+BBOX_SIZE_SUBBINS = 50
+BBOX_MEDIAN_EDGES = np.linspace(0, 100, (len(BBOX_SIZE_EDGES) - 1) * BBOX_SIZE_SUBBINS + 1)
+
+ROW_COLUMNS = ['dataset', 'duration', 'fps', 'total_frames', 'entities', 'annotation_coverage',
+               'annotated_frames', 'interaction_frames', 'top_state', 'median_box_size']
+
+def box_size_counts(boxes):
+    # BBOX_MEDIAN_EDGES histogram of sqrt(width * height) of box samples, boxes without a size are left out
+    sizes = np.sqrt(boxes['bbox_width'] * boxes['bbox_height'])
+    sizes = sizes[np.isfinite(sizes)]
+    counts, _ = np.histogram(np.clip(sizes, BBOX_MEDIAN_EDGES[0], BBOX_MEDIAN_EDGES[-1]), BBOX_MEDIAN_EDGES)
+    return counts
+
+def histogram_median(counts, edges):
+    # median of the counted values, interpolated linearly inside the bin it falls in
+    total = counts.sum()
+    if not total:
+        return None
+    cumulative = np.cumsum(counts)
+    i = int(np.searchsorted(cumulative, total / 2))
+    below = cumulative[i] - counts[i]
+    return float(edges[i] + (total / 2 - below) / counts[i] * (edges[i + 1] - edges[i]))
+
+def dataset_summary(name, results, analyzer):
+    # counters of one dataset out of analyze_dataset results and the analyzer tables
+    edges = analyzer.interaction_edges()
+    pair_frames = edges.groupby(['entity', 'object'], observed=True)['frames'].sum()
+    _, _, _, boxes = analyzer.box_samples()
+    return build_summary(name, results, pair_frames.to_dict(), box_size_counts(boxes))
+
+def build_summary(name, results, pair_frames, size_counts):
+    # pair_frames - interaction frames per (entity, object), size_counts - box_size_counts of the dataset
+    state_frames = Counter()
+    entity_frames = {}
+    for entity, stats in results['entity_stats'].items():
+        state_frames.update(stats['states'])
+        entity_frames[entity] = stats['total_frames']
+    
+    interactions = {f"{entity} -> {obj}": int(frames) for (entity, obj), frames in pair_frames.items()}
+    size_hist = size_counts.reshape(len(BBOX_SIZE_EDGES) - 1, BBOX_SIZE_SUBBINS).sum(axis=1)
+    
+    return {
+        'dataset': name,
+        **results['basic_stats'],
+        'annotated_frames': sum(stats['annotated_frames'] for stats in results['entity_stats'].values()),
+        'state_frames': dict(state_frames),
+        'entity_frames': entity_frames,
+        'interactions': interactions,
+        'bbox_size_hist': size_hist.tolist(),
+        'median_box_size': histogram_median(size_counts, BBOX_MEDIAN_EDGES)
+    }
+
+def write_summary(summary, output_dir):
+    summary_path = Path(output_dir) / SUMMARY_FILE
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=2, default=json_default)
+    return summary_path
+
+def load_summary(output_dir):
+    with open(Path(output_dir) / SUMMARY_FILE) as f:
+        return json.load(f)
+
+def summary_row(summary):
+    # flat comparison table row of one dataset
+    state_frames = summary['state_frames']
+    return {
+        'dataset': summary['dataset'],
+        'duration': summary['duration'],
+        'fps': summary['fps'],
+        'total_frames': summary['total_frames'],
+        'entities': summary['total_entities'],
+        'annotation_coverage': summary['annotation_coverage'],
+        'annotated_frames': summary['annotated_frames'],
+        'interaction_frames': sum(summary['interactions'].values()),
+        'top_state': max(state_frames, key=state_frames.get) if state_frames else None,
+        'median_box_size': summary['median_box_size']
+    }
+
+def empty_aggregate():
+    return {
+        'datasets': 0,
+        'failed': 0,
+        'duration': 0.0,
+        'total_frames': 0,
+        'annotated_frames': 0,
+        'state_frames': Counter(),
+        'entity_frames': Counter(),
+        'interactions': Counter(),
+        'bbox_size_hist': np.zeros(len(BBOX_SIZE_EDGES) - 1, dtype=np.int64)
+    }
+
+def merge_summary(aggregate, summary):
+    # add one dataset summary to the running aggregate (in place)
+    aggregate['datasets'] += 1
+    aggregate['duration'] += summary['duration']
+    aggregate['total_frames'] += summary['total_frames']
+    aggregate['annotated_frames'] += summary['annotated_frames']
+    for key in ('state_frames', 'entity_frames', 'interactions'):
+        aggregate[key].update(summary[key])
+    aggregate['bbox_size_hist'] += np.asarray(summary['bbox_size_hist'], dtype=np.int64)
+    return aggregate
+
+def reduce_summaries(output_dir, results):
+    # stream summaries of finished datasets into the aggregate and the comparison csv, in results order
+    aggregate = empty_aggregate()
+    rows_path = Path(output_dir) / COMPARISON_ROWS
+    with open(rows_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=ROW_COLUMNS)
+        writer.writeheader()
+        for name, result in results.items():
+            if result['error'] is not None:
+                aggregate['failed'] += 1
+                continue
+            summary = load_summary(Path(output_dir) / name)
+            merge_summary(aggregate, summary)
+            writer.writerow(summary_row(summary))
+    return aggregate, rows_path
+
+def format_value(value):
+    if value is None or value == '':
+        return '-'
+    try:
+        number = float(value)
+    except ValueError:
+        return html.escape(str(value))
+    return f"{number:.2f}" if not number.is_integer() else f"{int(number)}"
+
+def write_comparison(output_dir, aggregate, rows_path, link_reports=True, top=20):
+    # comparison page: totals, per dataset table (streamed from the csv) and aggregate distributions
+    # link_reports - dataset names link to their report.html (not written in stats mode)
+    page_path = Path(output_dir) / COMPARISON_PAGE
+    with open(page_path, 'w') as f:
+        f.write("""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <title>CVAP Tool - Comparison</title>
+            <style>
+                body { font-family: Arial, sans-serif; margin: 20px; }
+                .section { margin: 20px 0; padding: 20px; border: 1px solid #ddd; }
+                table { border-collapse: collapse; }
+                th, td { padding: 4px 10px; border-bottom: 1px solid #eee; text-align: right; }
+                th:first-child, td:first-child { text-align: left; }
+                .bar { display: inline-block; height: 10px; background: #4c78a8; }
+            </style>
+        </head>
+        <body>
+            <h1>Dataset Comparison</h1>
+        """)
+        
+        f.write('<div class="section"><h2>Totals</h2><table>')
+        for key in ('datasets', 'failed', 'duration', 'total_frames', 'annotated_frames'):
+            f.write(f"<tr><td>{key.replace('_', ' ').title()}</td><td>{format_value(aggregate[key])}</td></tr>")
+        f.write("</table></div>")
+        
+        f.write('<div class="section"><h2>Datasets</h2><table><tr>')
+        f.write("".join(f"<th>{column.replace('_', ' ').title()}</th>" for column in ROW_COLUMNS))
+        f.write("</tr>")
+        with open(rows_path, newline='') as rows:
+            for row in csv.DictReader(rows):
+                name = html.escape(row['dataset'])
+                cells = [f'<a href="{name}/report.html">{name}</a>' if link_reports else name]
+                cells += [format_value(row[column]) for column in ROW_COLUMNS[1:]]
+                f.write("<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>")
+        f.write("</table></div>")
+        
+        for key, title in (('state_frames', 'State Frames'), ('entity_frames', 'Entity Frames'),
+                           ('interactions', 'Interaction Frames')):
+            counts = aggregate[key].most_common(top)
+            largest = counts[0][1] if counts else 1
+            f.write(f'<div class="section"><h2>{title}</h2><table>')
+            for label, count in counts:
+                f.write(f'<tr><td>{html.escape(str(label))}</td><td>{count}</td>'
+                        f'<td><span class="bar" style="width: {200 * count / largest:.0f}px"></span></td></tr>')
+            f.write("</table></div>")
+        
+        hist = aggregate['bbox_size_hist']
+        largest = max(int(hist.max(initial=0)), 1)
+        f.write('<div class="section"><h2>Box Size (sqrt of area, % of frame)</h2><table>')
+        for low, high, count in zip(BBOX_SIZE_EDGES[:-1], BBOX_SIZE_EDGES[1:], hist):
+            f.write(f'<tr><td>{low:g} - {high:g}</td><td>{count}</td>'
+                    f'<td><span class="bar" style="width: {200 * count / largest:.0f}px"></span></td></tr>')
+        f.write("</table></div>")
+        
+        f.write("</body></html>")
+    
+    return page_path
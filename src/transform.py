@@ -1,46 +1,115 @@
 
 import xml.etree.ElementTree as ET
 import json
+import gzip
+import re
+from functools import lru_cache
+from array import array
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from src.profiling import logger, span
 
-def parse_state_relationship(state):
-    # getting subject and object states and relationships
-    if not state:
-        return None, []
-    # text parsing, getting information about entities and objects and their relationships 
-    # handle list of objects like moving_towards(black_car, [ego_car, white_car])
-    if '(' in state and ')' in state:
-        action = state.split('(')[0]
-        content = state.split('(')[1].rstrip(')')
-        
-        # if multiple objects in relationship (list)
-        if '[' in content and ']' in content:
-            # Split on comma first to get subject and list of objects
-            subject_and_objects = content.split(',', 1)
-            if len(subject_and_objects) > 1:
-                objects_str = subject_and_objects[1].strip()
-                objects_str = objects_str.strip('[]')
-                objects = [obj.strip() for obj in objects_str.split(',')]
-                return action, objects
-        
-        # 1:1 relationships (single entity, single object of action)
-        elif ',' in content:
-            entities = [e.strip() for e in content.split(',')]
-            return action, [entities[-1]]  # Return as list for consistency
+# bump when the frame table produced by process_files changes, invalidates cached tables
+TRANSFORM_VERSION = 3
+
+try:
+    # optional incremental json parser, used for large Label Studio exports
+    import ijson
+except ImportError:
+    ijson = None
+
+# annotation value grammar:
+#   value  := action [ '(' subject { ',' target } ')' ]
+#   target := name | '[' name { ',' name } ']'
+# objects are the names of the last target, e.g. moving_towards(black_car, [ego_car, white_car])
+# names may contain inner spaces, whitespace around names and punctuation is ignored
+RELATION_TOKENS = re.compile(r'\s*([(),\[\]])\s*')
+# distinct annotation values kept parsed, EAFs repeat a small vocabulary
+RELATION_CACHE_SIZE = 4096
+
+class RelationParseError(ValueError):
+    pass
+
+@lru_cache(maxsize=RELATION_CACHE_SIZE)
+def parse_relation(value):
+    # annotation value to (action, objects tuple), memoized per distinct value
+    tokens = [token for token in RELATION_TOKENS.split(value.strip()) if token]
+    if not tokens:
+        return None, ()
+    
+    def expect_name(i):
+        if i >= len(tokens) or tokens[i] in '(),[]':
+            found = repr(tokens[i]) if i < len(tokens) else "end of value"
+            raise RelationParseError(f"expected a name at {found} in {value!r}")
+        return tokens[i], i + 1
+    
+    def expect(i, punctuation):
+        if i >= len(tokens) or tokens[i] != punctuation:
+            found = repr(tokens[i]) if i < len(tokens) else "end of value"
+            raise RelationParseError(f"expected {punctuation!r} at {found} in {value!r}")
+        return i + 1
+    
+    action, i = expect_name(0)
+    if i == len(tokens):
+        return action, ()
+    
+    i = expect(i, '(')
+    _, i = expect_name(i)  # subject, the entity of the tier
+    objects = ()
+    while i < len(tokens) and tokens[i] == ',':
+        i += 1
+        if i < len(tokens) and tokens[i] == '[':
+            names = []
+            name, i = expect_name(i + 1)
+            names.append(name)
+            while i < len(tokens) and tokens[i] == ',':
+                name, i = expect_name(i + 1)
+                names.append(name)
+            i = expect(i, ']')
+            objects = tuple(names)
         else:
-            # single entity like visible(car1)
-            return action, []
-            
-    return state, []
+            name, i = expect_name(i)
+            objects = (name,)
+    i = expect(i, ')')
+    if i != len(tokens):
+        raise RelationParseError(f"unexpected {tokens[i]!r} after relation in {value!r}")
+    return action, objects
+
+class Interner:
+    # names to integer codes in order of first appearance, codes feed pd.Categorical.from_codes
+    def __init__(self):
+        self.codes = {}
+        self.names = []
+    
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+    
+    def categorical(self, codes):
+        # categories sorted like astype('category') would give
+        order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        recode = np.empty(len(self.names) + 1, dtype=np.int64)
+        recode[order] = np.arange(len(order))
+        recode[-1] = -1  # missing stays missing
+        return pd.Categorical.from_codes(recode[codes], categories=[self.names[i] for i in order])
+
+class AnnotationParseError(ValueError):
+    # all annotation values of an EAF that could not be parsed, errors holds one dict per value
+    def __init__(self, file_path, errors, shown=5):
+        self.errors = errors
+        details = "; ".join(f"tier {e['tier']} at {e['start']:.3f}-{e['end']:.3f}s: {e['error']}"
+                            for e in errors[:shown])
+        more = f" (and {len(errors) - shown} more)" if len(errors) > shown else ""
+        super().__init__(f"{len(errors)} annotation(s) could not be parsed in {file_path}: {details}{more}")
 
-def get_video_metadata(json_data):
-    # json metadata extraction for overall information about files
-    first_annotation = json_data['annotations'][0]
-    first_result = first_annotation['result'][0]
-    # duration, number of frames
-    sequence = first_result['value']['sequence']
-    duration = first_result['value']['duration']
+def get_sequence_metadata(result):
+    # duration, number of frames and fps out of a single videorectangle result
+    sequence = result['value']['sequence']
+    duration = result['value']['duration']
     
     # total frames
     total_frames = max(frame['frame'] for frame in sequence)
@@ -55,173 +124,395 @@ def get_video_metadata(json_data):
         'fps': fps
     }
 
+def open_input(file_path, mode='rb'):
+    # open plain or gzip compressed (.gz) input file
+    if str(file_path).endswith('.gz'):
+        return gzip.open(file_path, mode)
+    return open(file_path, mode)
+
+def iter_label_studio_results(f):
+    # walk annotations[].result[] one result at a time
+    if ijson is not None:
+        yield from ijson.items(f, 'annotations.item.result.item', use_float=True)
+    else:
+        # fallback without ijson - whole tree is loaded
+        for annotation in json.load(f).get('annotations', []):
+            yield from annotation.get('result', [])
+
 def parse_label_studio_json(file_path):
     # json parsing for bounding box data (x, y cord + x, y width and height)
-    with open(file_path) as f:
-        json_data = json.load(f)
-    
-    metadata = get_video_metadata(json_data)
-    bbox_data = []
-    
-    print("Parsing JSON annotations...")
-    for annotation in json_data.get('annotations', []):
-        for result in annotation.get('result', []):
-            if result.get('type') == 'videorectangle':
-                entity = result.get('meta', {}).get('text', ['unknown'])[0]
-                print(f"Found entity in JSON: {entity}")
-                sequence = result.get('value', {}).get('sequence', [])
-                
-                for frame_data in sequence:
-                    bbox_data.append({
-                        'frame': frame_data.get('frame'),
-                        'timestamp': frame_data.get('time'),
-                        'entity': entity,
-                        'bbox_x': frame_data.get('x'),
-                        'bbox_y': frame_data.get('y'),
-                        'bbox_width': frame_data.get('width'),
-                        'bbox_height': frame_data.get('height'),
-                        'bbox_enabled': frame_data.get('enabled', True)
-                    })
-    
-    return pd.DataFrame(bbox_data), metadata
-
-def expand_annotation_to_frames(row, fps, total_frames):
-    # stretching annotation to get it for all affected frames
-    start_frame = max(1, int(row['timestamp_start'] * fps) + 1)
-    end_frame = min(int(row['timestamp_end'] * fps) + 1, total_frames + 1)
-    
-    frames = range(start_frame, end_frame)
-    frames_data = []
-    
-    # rows for each object in an annotation action
-    if row['objects']:  # single row for each action, entity and object of relationship state
-        for obj in row['objects']:
-            for frame in frames:
-                frames_data.append({
-                    'frame': frame,
-                    'timestamp': frame/fps,
-                    'entity': row['entity'],
-                    'category': row['category'],
-                    'state': row['state'],
-                    'object': obj
-                })
-    else:
-        # in case of no objects (single entity state)
-        for frame in frames:
-            frames_data.append({
-                'frame': frame,
-                'timestamp': frame/fps,
-                'entity': row['entity'],
-                'category': row['category'],
-                'state': row['state'],
-                'object': None
-            })
-    
-    return pd.DataFrame(frames_data)
-
-def parse_elan_xml(file_path, fps, total_frames):
-    # parsing XML to pull out annotations from EAF file
-    tree = ET.parse(file_path)
-    root = tree.getroot()
-    
-    time_slots = {
-        slot.get('TIME_SLOT_ID'): float(slot.get('TIME_VALUE', 0))/1000.0 
-        for slot in root.findall('.//TIME_SLOT')
-    }
-    
-    annotations = []
+    # keyframes are filled straight into typed column arrays, dataframe is built once at the end
+    frames = array('i')
+    float_columns = {key: array('f') for key in ('time', 'x', 'y', 'width', 'height')}
+    enabled = bytearray()
+    entities = []
+    entity_counts = []
+    metadata = None
     
-    for tier in root.findall('.//TIER'):
-        tier_id = tier.get('TIER_ID')
-        if '(' not in tier_id or ')' not in tier_id:
-            continue
+    logger.info("Parsing JSON annotations...")
+    with open_input(file_path) as f:
+        for result in iter_label_studio_results(f):
+            if metadata is None:
+                metadata = get_sequence_metadata(result)
+            if result.get('type') != 'videorectangle':
+                continue
             
-        category, entity = tier_id.split('(')
-        entity = entity.rstrip(')')
-        
-        for annotation in tier.findall('.//ALIGNABLE_ANNOTATION'):
-            start_slot = annotation.get('TIME_SLOT_REF1')
-            end_slot = annotation.get('TIME_SLOT_REF2')
-            value = annotation.find('ANNOTATION_VALUE').text
+            entity = result.get('meta', {}).get('text', ['unknown'])[0]
+            sequence = result.get('value', {}).get('sequence', [])
             
+            for frame_data in sequence:
+                frames.append(frame_data.get('frame'))
+                for key, column in float_columns.items():
+                    value = frame_data.get(key)
+                    column.append(np.nan if value is None else value)
+                enabled.append(bool(frame_data.get('enabled', True)))
+            
+            entities.append(entity)
+            entity_counts.append(len(sequence))
+    
+    if metadata is None:
+        raise ValueError(f"No annotation results found in {file_path}")
+    logger.info("Found %d entities in JSON: %s", len(entities), ', '.join(entities))
+    
+    bbox_df = pd.DataFrame({
+        'frame': np.frombuffer(frames, dtype=np.int32),
+        'timestamp': np.frombuffer(float_columns['time'], dtype=np.float32),
+        'entity': pd.Categorical(np.repeat(np.array(entities, dtype=object), entity_counts),
+                                 categories=list(dict.fromkeys(entities))),
+        'bbox_x': np.frombuffer(float_columns['x'], dtype=np.float32),
+        'bbox_y': np.frombuffer(float_columns['y'], dtype=np.float32),
+        'bbox_width': np.frombuffer(float_columns['width'], dtype=np.float32),
+        'bbox_height': np.frombuffer(float_columns['height'], dtype=np.float32),
+        'bbox_enabled': np.frombuffer(enabled, dtype=np.bool_)
+    })
+    
+    return bbox_df, metadata
+
+INTERVAL_COLUMNS = ['start_frame', 'end_frame', 'entity', 'category', 'state', 'object']
+
+# compact dtypes: categorical labels, int32 frames, float32 geometry, nullable booleans
+LABEL_COLUMNS = ['entity', 'category', 'state', 'object']
+GEOMETRY_COLUMNS = ['bbox_x', 'bbox_y', 'bbox_width', 'bbox_height']
+
+INTERVAL_SCHEMA = {
+    'start_frame': 'int32',
+    'end_frame': 'int32',
+    **{column: 'category' for column in LABEL_COLUMNS}
+}
+
+FRAME_SCHEMA = {
+    'frame': 'int32',
+    'timestamp': 'float64',
+    **{column: 'category' for column in LABEL_COLUMNS},
+    **{column: 'float32' for column in GEOMETRY_COLUMNS},
+    'bbox_enabled': 'boolean',
+    'has_annotation': 'bool'
+}
+
+# plain python/numpy dtypes the frame table used to have, only used for --memory-report
+LEGACY_FRAME_SCHEMA = {
+    'frame': 'int64',
+    'timestamp': 'float64',
+    **{column: 'object' for column in LABEL_COLUMNS},
+    **{column: 'float64' for column in GEOMETRY_COLUMNS},
+    'bbox_enabled': 'object',
+    'has_annotation': 'bool'
+}
+
+def apply_schema(df, schema):
+    # cast columns present in df to given dtypes
+    return df.astype({column: dtype for column, dtype in schema.items() if column in df.columns})
+
+def memory_report(df):
+    # per column bytes of frame table with legacy dtypes (before) and compact schema (after)
+    legacy_df = apply_schema(df, LEGACY_FRAME_SCHEMA)
+    report = pd.DataFrame({
+        'before': legacy_df.memory_usage(index=False, deep=True),
+        'after': apply_schema(df, FRAME_SCHEMA).memory_usage(index=False, deep=True)
+    })
+    report.loc['total'] = report.sum()
+    return report
+
+def expand_intervals_to_frames(intervals, fps):
+    # materializing frame level rows out of interval table, vectorized with repeat/arange
+    if intervals.empty:
+        return pd.DataFrame(columns=['frame', 'timestamp', 'entity', 'category', 'state', 'object'])
+    
+    starts = intervals['start_frame'].to_numpy(dtype=np.int64)
+    lengths = np.clip(intervals['end_frame'].to_numpy(dtype=np.int64) - starts, 0, None)
+    
+    # offset of every frame within its interval
+    row_idx = np.repeat(np.arange(len(intervals)), lengths)
+    interval_offsets = np.cumsum(lengths) - lengths
+    frames = np.repeat(starts, lengths) + (np.arange(lengths.sum()) - interval_offsets[row_idx])
+    
+    frames_df = intervals[['entity', 'category', 'state', 'object']].iloc[row_idx].reset_index(drop=True)
+    frames_df.insert(0, 'frame', frames.astype(np.int32))
+    frames_df.insert(1, 'timestamp', frames / fps)
+    
+    return frames_df
+
+def read_elan_annotations(file_path):
+    # single pass over EAF (plain or .eaf.gz) with iterparse, elements are cleared once read
+    # returns alignable annotations of category(entity) tiers as columns
+    time_slots = {}
+    tier_annotations = []
+    columns = {key: [] for key in ('tier', 'category', 'entity', 'start_slot', 'end_slot', 'value')}
+    
+    with open_input(file_path) as f:
+        # start events are only used to get hold of the root, its finished children are dropped
+        # after every TIER and TIME_ORDER, their elements are cleared as soon as they are read
+        root = None
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+            tag = elem.tag
+            if tag == 'TIME_SLOT':
+                time_slots[elem.get('TIME_SLOT_ID')] = float(elem.get('TIME_VALUE', 0))/1000.0
+                elem.clear()
+            elif tag == 'ALIGNABLE_ANNOTATION':
+                value = elem.find('ANNOTATION_VALUE')
+                tier_annotations.append((elem.get('TIME_SLOT_REF1'), elem.get('TIME_SLOT_REF2'), value.text))
+                elem.clear()
+            elif tag == 'ANNOTATION':
+                elem.clear()
+            elif tag == 'TIER':
+                # tier id is known here, its annotations were buffered while the tier was read
+                tier_id = elem.get('TIER_ID')
+                if '(' in tier_id and ')' in tier_id:
+                    category, entity = tier_id.split('(')
+                    entity = entity.rstrip(')')
+                    for start_slot, end_slot, value in tier_annotations:
+                        columns['tier'].append(tier_id)
+                        columns['category'].append(category)
+                        columns['entity'].append(entity)
+                        columns['start_slot'].append(start_slot)
+                        columns['end_slot'].append(end_slot)
+                        columns['value'].append(value)
+                tier_annotations = []
+                del root[:]
+            elif tag == 'TIME_ORDER':
+                del root[:]
+    
+    # resolving time slot references, annotations with unknown slots are skipped
+    start_slots = columns.pop('start_slot')
+    end_slots = columns.pop('end_slot')
+    keep = [i for i, (start, end) in enumerate(zip(start_slots, end_slots))
+            if start in time_slots and end in time_slots]
+    
+    annotations = {key: [values[i] for i in keep] for key, values in columns.items()}
+    annotations['timestamp_start'] = [time_slots[start_slots[i]] for i in keep]
+    annotations['timestamp_end'] = [time_slots[end_slots[i]] for i in keep]
+    
+    return annotations
+
+def parse_elan_xml(file_path, fps, total_frames, errors=None):
+    # parsing XML to pull out annotations from EAF file as interval table
+    # state and object names are interned to codes and become categoricals without string columns
+    # values that don't parse are collected with tier and time range; with an errors list they are
+    # appended to it and skipped, without one AnnotationParseError lists all of them once the file is read
+    annotations = read_elan_annotations(file_path)
+    
+    states = Interner()
+    objects = Interner()
+    # per distinct value (state code, object codes), -1 for no state/object
+    value_codes = {}
+    keep = []
+    state_codes = []
+    object_codes = []
+    parse_errors = []
+    
+    for i, value in enumerate(annotations['value']):
+        codes = value_codes.get(value)
+        if codes is None:
             try:
-                if start_slot in time_slots and end_slot in time_slots:
-                    state, objects = parse_state_relationship(value)
-                    
-                    row = {
-                        'timestamp_start': time_slots[start_slot],
-                        'timestamp_end': time_slots[end_slot],
-                        'entity': entity,
-                        'category': category,
-                        'state': state,
-                        'objects': objects
-                    }
-                    
-                    frame_rows = expand_annotation_to_frames(row, fps, total_frames)
-                    annotations.append(frame_rows)
-            except Exception as e:
-                print(f"Error processing annotation: {value}")
-                print(f"In tier: {tier_id}")
-                print(f"Error: {str(e)}")
-                raise
-    
-    return pd.concat(annotations, ignore_index=True) if annotations else pd.DataFrame()
-
-def create_base_dataframe(metadata, bbox_df):
-    # base dataframe creation - per frame per entity
-    entities = bbox_df['entity'].unique()
-    frames = range(1, metadata['total_frames'] + 1)
-    
-    frame_entity_pairs = [(frame, entity) 
-                         for frame in frames 
-                         for entity in entities]
-    
-    base_df = pd.DataFrame(frame_entity_pairs, columns=['frame', 'entity'])
+                action, names = parse_relation(value) if value else (None, ())
+            except RelationParseError as e:
+                parse_errors.append({
+                    'tier': annotations['tier'][i],
+                    'value': value,
+                    'start': annotations['timestamp_start'][i],
+                    'end': annotations['timestamp_end'][i],
+                    'error': str(e)
+                })
+                continue
+            # single entity state (no objects) is kept as one interval with empty object
+            codes = value_codes[value] = (states.code(action) if action is not None else -1,
+                                          [objects.code(name) for name in names] or [-1])
+        keep.append(i)
+        state_codes.append(codes[0])
+        object_codes.append(codes[1])
+    
+    if parse_errors and errors is None:
+        raise AnnotationParseError(file_path, parse_errors)
+    if errors is not None:
+        errors.extend(parse_errors)
+    
+    # one interval [start_frame, end_frame) per object of an annotation
+    counts = np.array([len(codes) for codes in object_codes], dtype=np.int64)
+    rows = np.repeat(np.asarray(keep, dtype=np.int64), counts)
+    starts = np.asarray(annotations['timestamp_start'], dtype=np.float64)[rows]
+    ends = np.asarray(annotations['timestamp_end'], dtype=np.float64)[rows]
+    
+    intervals = pd.DataFrame({
+        'start_frame': np.maximum(1, np.trunc(starts * fps).astype(np.int64) + 1),
+        'end_frame': np.minimum(np.trunc(ends * fps).astype(np.int64) + 1, total_frames + 1),
+        'entity': np.asarray(annotations['entity'], dtype=object)[rows],
+        'category': np.asarray(annotations['category'], dtype=object)[rows],
+        'state': states.categorical(np.repeat(np.asarray(state_codes, dtype=np.int64), counts)),
+        'object': objects.categorical(np.asarray([code for codes in object_codes for code in codes], dtype=np.int64))
+    }, columns=INTERVAL_COLUMNS)
+    
+    return apply_schema(intervals, INTERVAL_SCHEMA)
+
+def interpolate_keyframes(bbox_df, frame_range=None):
+    # fill frames between keyframes linearly per entity like Label Studio tweening
+    # a disabled keyframe ends the track, no boxes until the next keyframe; nothing after the last keyframe
+    # all segments are expanded at once with repeat/arange, keyframe rows are kept as they are
+    # frame_range - (first, last) frames the tweened rows are made for, a window only pays for its own frames
+    order = np.lexsort((bbox_df['frame'].to_numpy(), bbox_df['entity'].cat.codes.to_numpy()))
+    keyframes = bbox_df.iloc[order].reset_index(drop=True)
+    
+    codes = keyframes['entity'].cat.codes.to_numpy()
+    frames = keyframes['frame'].to_numpy(dtype=np.int64)
+    enabled = keyframes['bbox_enabled'].to_numpy(dtype=bool)
+    
+    # segment i goes from keyframe i to keyframe i + 1 of the same entity, interior frames are new rows
+    starts = np.flatnonzero((codes[:-1] == codes[1:]) & enabled[:-1])
+    lengths = frames[starts + 1] - frames[starts]
+    # interior offsets first_offset..last_offset of every segment (1..length - 1 without a frame range)
+    first_offset = np.ones(len(starts), dtype=np.int64)
+    last_offset = lengths - 1
+    if frame_range is not None:
+        first_offset = np.maximum(first_offset, frame_range[0] - frames[starts])
+        last_offset = np.minimum(last_offset, frame_range[1] - frames[starts])
+    interior = np.clip(last_offset - first_offset + 1, 0, None)
+    if interior.sum() == 0:
+        return keyframes
+    
+    segment = np.repeat(np.arange(len(starts)), interior)
+    offsets = np.arange(interior.sum()) - np.repeat(np.cumsum(interior) - interior, interior) + first_offset[segment]
+    left, right = starts[segment], starts[segment] + 1
+    weight = offsets / lengths[segment]
+    
+    tween = {
+        'frame': (frames[left] + offsets).astype(np.int32),
+        'entity': keyframes['entity'].take(left).reset_index(drop=True)
+    }
+    for column in ['timestamp'] + GEOMETRY_COLUMNS:
+        values = keyframes[column].to_numpy(dtype=np.float64)
+        tween[column] = (values[left] + weight * (values[right] - values[left])).astype(keyframes[column].dtype)
+    tween['bbox_enabled'] = np.ones(len(segment), dtype=np.bool_)
+    
+    combined = pd.concat([keyframes, pd.DataFrame(tween)[keyframes.columns]], ignore_index=True)
+    order = np.lexsort((combined['frame'].to_numpy(), combined['entity'].cat.codes.to_numpy()))
+    return combined.iloc[order].reset_index(drop=True)
+
+def create_base_dataframe(metadata, bbox_df, first_frame=1, last_frame=None):
+    # base dataframe creation - per frame per entity, frames first_frame..last_frame (whole video by default)
+    # dense grid built with repeat/tile, entity categories are in order of appearance in the JSON
+    entity_dtype = bbox_df['entity'].dtype
+    n_entities = len(entity_dtype.categories)
+    last_frame = metadata['total_frames'] if last_frame is None else last_frame
+    frames = np.arange(first_frame, last_frame + 1, dtype=np.int32)
+    
+    base_df = pd.DataFrame({
+        'frame': np.repeat(frames, n_entities),
+        'entity': pd.Categorical.from_codes(np.tile(np.arange(n_entities), len(frames)), dtype=entity_dtype)
+    })
     base_df['timestamp'] = base_df['frame'] / metadata['fps']
     
     return base_df
 
-def process_files(xml_path, json_path):
-    # process EAF and JSON files
-    # get metadata and bounding boxes - print out for check
-    bbox_df, metadata = parse_label_studio_json(json_path)
-    print("\nJSON DataFrame shape:", bbox_df.shape)
-    print("JSON first few rows:")
-    print(bbox_df.head())
+def frame_entity_keys(df, n_entities, frame_range):
+    # dense (frame, entity) key = grid position of the row, -1 for rows outside of the grid
+    first_frame, last_frame = frame_range
+    frames = df['frame'].to_numpy(dtype=np.int64)
+    codes = df['entity'].cat.codes.to_numpy(dtype=np.int64)
+    keys = (frames - first_frame) * n_entities + codes
+    return np.where((codes >= 0) & (frames >= first_frame) & (frames <= last_frame), keys, -1)
+
+def aligned_left_join(left_keys, right_keys, n_keys):
+    # left join on dense integer keys (no hashing), same rows and order as pd.merge(how='left')
+    # returns row positions into left and right, right position is -1 where nothing matched
+    right_rows = np.flatnonzero(right_keys >= 0)
+    valid_keys = right_keys[right_rows]
+    # right rows grouped by key, original order kept within a key
+    order = right_rows[np.argsort(valid_keys, kind='stable')]
+    counts = np.bincount(valid_keys, minlength=n_keys)
+    group_starts = np.cumsum(counts) - counts
     
-    # all frames dataframe
-    base_df = create_base_dataframe(metadata, bbox_df)
-    print("\nBase DataFrame shape:", base_df.shape)
+    matches = counts[left_keys]
+    repeats = np.maximum(matches, 1)
+    left_idx = np.repeat(np.arange(len(left_keys)), repeats)
+    offsets = np.arange(len(left_idx)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
     
-    # run transformation engine to get annotations
-    xml_df = parse_elan_xml(xml_path, metadata['fps'], metadata['total_frames'])
-    print("\nXML DataFrame shape:", xml_df.shape)
-    print("XML first few rows:")
-    print(xml_df.head())
+    right_idx = np.full(len(left_idx), -1, dtype=np.int64)
+    matched = np.repeat(matches > 0, repeats)
+    right_idx[matched] = order[group_starts[left_keys[left_idx[matched]]] + offsets[matched]]
     
-    # merge bounding box data to base dataframe
-    # rounding timestamps to ease up merging of dataframes
-    bbox_df['timestamp'] = bbox_df['timestamp'].round(3)
-    base_df['timestamp'] = base_df['timestamp'].round(3)
+    return left_idx, right_idx
+
+def take_rows(df, idx, columns):
+    # rows by position, -1 positions become missing values
+    return {column: pd.api.extensions.take(df[column].array, idx, allow_fill=True) for column in columns}
+
+def join_aligned(base_df, bbox_df, xml_df, frame_range):
+    # both joins by grid offset arithmetic, frames are a dense first..last range per entity
+    n_entities = len(base_df['entity'].dtype.categories)
+    n_keys = (frame_range[1] - frame_range[0] + 1) * n_entities
     
-    print("\nAttempting merge with bounding box data...")
-    with_bbox = pd.merge(
-        base_df,
-        bbox_df,
-        on=['frame', 'entity'],  # removed timestamp from merge keys
-        how='left'
-    )
-    print("\nAfter bbox merge shape:", with_bbox.shape)
+    with span('merge_bbox', engine='aligned'):
+        # base rows are the grid itself, so their key is their position
+        left_idx, right_idx = aligned_left_join(np.arange(len(base_df)),
+                                                frame_entity_keys(bbox_df, n_entities, frame_range),
+                                                n_keys)
+        bbox_columns = [column for column in bbox_df.columns if column not in ('frame', 'entity', 'timestamp')]
+        with_bbox = pd.DataFrame({
+            **take_rows(base_df, left_idx, ['frame', 'entity']),
+            **take_rows(bbox_df, right_idx, bbox_columns)
+        })
+        # update timestamp with bounding box
+        with_bbox['timestamp'] = pd.Series(take_rows(bbox_df, right_idx, ['timestamp'])['timestamp']).fillna(
+            pd.Series(base_df['timestamp'].to_numpy()[left_idx]))
     
-    # update timestamp with bounding box
-    with_bbox['timestamp'] = with_bbox['timestamp_y'].fillna(with_bbox['timestamp_x'])
-    with_bbox = with_bbox.drop(['timestamp_x', 'timestamp_y'], axis=1)
+    if xml_df.empty:
+        return with_bbox
     
-    # timestamp rounding for EAF file merging
-    if not xml_df.empty:
-        xml_df['timestamp'] = xml_df['timestamp'].round(3)
+    with span('merge_elan', engine='aligned'):
+        left_idx, right_idx = aligned_left_join(frame_entity_keys(with_bbox, n_entities, frame_range),
+                                                frame_entity_keys(xml_df, n_entities, frame_range),
+                                                n_keys)
+        final_df = pd.DataFrame({
+            **take_rows(with_bbox, left_idx, [column for column in with_bbox.columns if column != 'timestamp']),
+            **take_rows(xml_df, right_idx, ['category', 'state', 'object'])
+        })
+        # update timestamp from xml_df where available
+        final_df['timestamp'] = pd.Series(take_rows(xml_df, right_idx, ['timestamp'])['timestamp']).fillna(
+            pd.Series(with_bbox['timestamp'].to_numpy()[left_idx]))
+    
+    return final_df
+
+def join_hash(base_df, bbox_df, xml_df, frame_range):
+    # reference implementation with hash merges on (frame, entity)
+    with span('merge_bbox', engine='hash'):
+        with_bbox = pd.merge(
+            base_df,
+            bbox_df,
+            on=['frame', 'entity'],  # removed timestamp from merge keys
+            how='left'
+        )
         
-        print("\nAttempting merge with ELAN annotations...")
+        # update timestamp with bounding box
+        with_bbox['timestamp'] = with_bbox['timestamp_y'].fillna(with_bbox['timestamp_x'])
+        with_bbox = with_bbox.drop(['timestamp_x', 'timestamp_y'], axis=1)
+    
+    if xml_df.empty:
+        return with_bbox
+    
+    with span('merge_elan', engine='hash'):
         final_df = pd.merge(
             with_bbox,
             xml_df,
@@ -232,17 +523,149 @@ def process_files(xml_path, json_path):
         # update timestamp from xml_df where available
         final_df['timestamp'] = final_df['timestamp_y'].fillna(final_df['timestamp_x'])
         final_df = final_df.drop(['timestamp_x', 'timestamp_y'], axis=1)
-    else:
-        final_df = with_bbox
+    
+    return final_df
+
+JOIN_ENGINES = {'aligned': join_aligned, 'hash': join_hash}
+
+def read_annotations(xml_path, json_path):
+    # parsed inputs: keyframe boxes, video metadata and ELAN interval table
+    # all three are per keyframe/annotation, frame level rows only come out of merge_frame_table
+    # annotation values that don't parse are skipped and kept in metadata['parse_errors'],
+    # so they are cached along with the frame table and end up in the results
+    with span('parse_json', path=str(json_path)):
+        bbox_df, metadata = parse_label_studio_json(json_path)
+    with span('parse_eaf', path=str(xml_path)):
+        errors = []
+        intervals_df = parse_elan_xml(xml_path, metadata['fps'], metadata['total_frames'], errors)
+    for error in errors:
+        logger.warning("Skipping annotation %r in tier %s at %.3f-%.3fs: %s",
+                       error['value'], error['tier'], error['start'], error['end'], error['error'])
+    metadata['parse_errors'] = errors
+    logger.debug("XML intervals shape: %s", intervals_df.shape)
+    return bbox_df, intervals_df, metadata
+
+def clip_intervals(intervals_df, first_frame, last_frame):
+    # intervals cut to frames first_frame..last_frame, intervals outside are dropped
+    starts = np.maximum(intervals_df['start_frame'].to_numpy(), first_frame)
+    ends = np.minimum(intervals_df['end_frame'].to_numpy(), last_frame + 1)
+    inside = ends > starts
+    return intervals_df[inside].assign(start_frame=starts[inside], end_frame=ends[inside])
+
+def merge_frame_table(bbox_df, intervals_df, metadata, join_engine='aligned', frame_range=None):
+    # frame table of frames in frame_range (first, last), whole video by default
+    # bbox_df only needs the boxes of those frames, intervals are clipped to the range here
+    first_frame, last_frame = frame_range or (1, metadata['total_frames'])
+    
+    # all frames dataframe
+    with span('build_grid'):
+        base_df = create_base_dataframe(metadata, bbox_df, first_frame, last_frame)
+    logger.debug("Base DataFrame shape: %s", base_df.shape)
+    
+    # frame rows of the annotations only materialized for the merge
+    with span('expand_intervals'):
+        window_intervals = intervals_df if frame_range is None else clip_intervals(intervals_df, first_frame, last_frame)
+        xml_df = expand_intervals_to_frames(window_intervals, metadata['fps'])
+    logger.debug("XML DataFrame shape: %s", xml_df.shape)
+    logger.debug("XML first few rows:\n%s", xml_df.head())
+    
+    # rounding timestamps to ease up merging of dataframes
+    bbox_df = bbox_df.assign(timestamp=bbox_df['timestamp'].round(3))
+    base_df['timestamp'] = base_df['timestamp'].round(3)
+    if not xml_df.empty:
+        # set_categories recodes to grid entity order (astype is a no-op for the same category set)
+        xml_df['entity'] = xml_df['entity'].cat.set_categories(base_df['entity'].cat.categories)
+        xml_df['timestamp'] = xml_df['timestamp'].round(3)
+    
+    # merge bounding box data and ELAN annotations to base dataframe
+    with span('join', engine=join_engine):
+        final_df = JOIN_ENGINES[join_engine](base_df, bbox_df, xml_df, (first_frame, last_frame))
+    
+    if xml_df.empty and not intervals_df.empty:
+        # no annotation in range (window), same columns and label categories as the joined windows
+        final_df = final_df.drop(columns='timestamp').assign(
+            **{column: pd.Categorical.from_codes(np.full(len(final_df), -1), dtype=intervals_df[column].dtype)
+               for column in ('category', 'state', 'object')},
+            timestamp=final_df['timestamp'])
+    elif xml_df.empty:
         final_df['category'] = None
         final_df['state'] = None
         final_df['object'] = None
     
     # mark frames with/without annotations
     final_df['has_annotation'] = ~final_df['state'].isna()
+    final_df = apply_schema(final_df, FRAME_SCHEMA)
+    
+    logger.debug("Final DataFrame shape: %s", final_df.shape)
+    logger.debug("Final DataFrame columns: %s", final_df.columns.tolist())
+    
+    return final_df
+
+def build_frame_table(xml_path, json_path, join_engine='aligned', interpolate=False):
+    # process EAF and JSON files into the frame table of the whole video
+    bbox_df, intervals_df, metadata = read_annotations(xml_path, json_path)
+    if interpolate:
+        # boxes for frames between keyframes, otherwise only keyframes have bbox values
+        with span('interpolate'):
+            bbox_df = interpolate_keyframes(bbox_df)
+    logger.debug("JSON DataFrame shape: %s", bbox_df.shape)
+    logger.debug("JSON first few rows:\n%s", bbox_df.head())
+    
+    return merge_frame_table(bbox_df, intervals_df, metadata, join_engine), metadata
+
+def frame_windows(total_frames, window_frames):
+    # (first, last) frame ranges of window_frames frames covering 1..total_frames
+    return [(first, min(first + window_frames - 1, total_frames))
+            for first in range(1, total_frames + 1, window_frames)]
+
+def window_keyframes(keyframes, first_frame, last_frame):
+    # keyframes needed to interpolate frames first_frame..last_frame, keyframes sorted by (entity, frame)
+    # the ones inside plus both ends of every segment crossing the window edges
+    codes = keyframes['entity'].cat.codes.to_numpy()
+    frames = keyframes['frame'].to_numpy()
+    keep = (frames >= first_frame) & (frames <= last_frame)
+    crossing = (codes[:-1] == codes[1:]) & (frames[:-1] <= last_frame) & (frames[1:] >= first_frame)
+    keep[:-1] |= crossing
+    keep[1:] |= crossing
+    return keyframes[keep]
+
+def frame_table_windows(bbox_df, intervals_df, metadata, window_frames, join_engine='aligned', interpolate=False):
+    # frame table in windows of window_frames frames, yields (frame_range, table) one window at a time
+    # memory follows the window size, concatenated windows are the table of merge_frame_table
+    if interpolate:
+        bbox_df = bbox_df.iloc[np.lexsort((bbox_df['frame'].to_numpy(),
+                                           bbox_df['entity'].cat.codes.to_numpy()))]
+    
+    for frame_range in frame_windows(metadata['total_frames'], window_frames):
+        first_frame, last_frame = frame_range
+        with span('window', first_frame=first_frame, last_frame=last_frame):
+            if interpolate:
+                with span('interpolate'):
+                    boxes = interpolate_keyframes(window_keyframes(bbox_df, first_frame, last_frame), frame_range)
+            else:
+                boxes = bbox_df
+            frames = boxes['frame'].to_numpy()
+            boxes = boxes[(frames >= first_frame) & (frames <= last_frame)]
+            window_df = merge_frame_table(boxes, intervals_df, metadata, join_engine, frame_range)
+        yield frame_range, window_df
+
+def process_files(xml_path, json_path, cache=None, join_engine='aligned', interpolate=False):
+    # final frame table and metadata, reused from cache when inputs and transform version didn't change
+    # both join engines give the same table, so the engine is not part of the cache key
+    if cache is None:
+        return build_frame_table(xml_path, json_path, join_engine, interpolate)
+    
+    # interpolated tables are cached separately, keys of plain tables stay the same
+    key = cache.key(xml_path, json_path, TRANSFORM_VERSION, {'interpolate': True} if interpolate else None)
+    with span('cache_load'):
+        cached = cache.load(key)
+    if cached is not None:
+        logger.info("Loaded frame table from cache (%s)", key[:12])
+        return cached
     
-    print("\nFinal DataFrame shape:", final_df.shape)
-    print("Final DataFrame columns:", final_df.columns.tolist())
+    final_df, metadata = build_frame_table(xml_path, json_path, join_engine, interpolate)
+    with span('cache_store'):
+        cache.store(key, final_df, metadata)
     
     return final_df, metadata
 
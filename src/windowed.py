@@ -0,0 +1,115 @@
+from collections import Counter
+from pathlib import Path
+import numpy as np
+from src.analyze import VideoAnalyzer
+from src.transform import read_annotations, frame_table_windows
+from src.export import (TableWriter, frame_table_writer, write_table, write_results, write_partitions,
+                        partition_dir, remove_video_partitions)
+from src.summary import box_size_counts, build_summary, write_summary, BBOX_MEDIAN_EDGES
+from src.profiling import logger, span
+
+# out-of-core stats for long videos (--window-frames): the frame table is built, analyzed and written
+# one window of frames at a time and only mergeable counters of every window are kept
+# every (entity, frame) row group lies in exactly one window, so the merged counters give the same
+# results as analyze_dataset on the whole table
+
+def empty_window_stats():
+    return {
+        'rows': 0,
+        'annotated_rows': 0,
+        'entity_stats': {},
+        'interactions': Counter(),
+        'box_size_counts': np.zeros(len(BBOX_MEDIAN_EDGES) - 1, dtype=np.int64)
+    }
+
+def window_stats(df, metadata):
+    # counters of one window of the frame table, same shape as the running total
+    analyzer = VideoAnalyzer(df, metadata)
+    edges = analyzer.interaction_edges()
+    pair_frames = edges.groupby(['entity', 'object'], observed=True)['frames'].sum()
+    _, _, _, boxes = analyzer.box_samples()
+    
+    return {
+        'rows': len(df),
+        'annotated_rows': int(df['has_annotation'].sum()),
+        'entity_stats': {entity: analyzer.analyze_entity_states(entity) for entity in analyzer.entities},
+        'interactions': Counter({pair: int(frames) for pair, frames in pair_frames.items()}),
+        'box_size_counts': box_size_counts(boxes)
+    }
+
+def merge_window_stats(total, stats):
+    # add the counters of one window to the running total (in place)
+    total['rows'] += stats['rows']
+    total['annotated_rows'] += stats['annotated_rows']
+    for entity, entity_stats in stats['entity_stats'].items():
+        merged = total['entity_stats'].setdefault(entity, {'total_frames': 0, 'annotated_frames': 0,
+                                                           'states': Counter(), 'categories': Counter()})
+        merged['total_frames'] += entity_stats['total_frames']
+        merged['annotated_frames'] += entity_stats['annotated_frames']
+        merged['states'].update(entity_stats['states'])
+        merged['categories'].update(entity_stats['categories'])
+    total['interactions'].update(stats['interactions'])
+    total['box_size_counts'] += stats['box_size_counts']
+    return total
+
+def window_results(total, metadata):
+    # analyze_dataset results out of the merged counters
+    # entities in order of first appearance, states and categories sorted like the analyzer groupbys
+    return {
+        'basic_stats': {
+            'duration': metadata['duration'],
+            'total_frames': metadata['total_frames'],
+            'fps': metadata['fps'],
+            'total_entities': len(total['entity_stats']),
+            'annotation_coverage': float(total['annotated_rows']) / total['rows']
+        },
+        'entity_stats': {
+            entity: {
+                'total_frames': stats['total_frames'],
+                'annotated_frames': stats['annotated_frames'],
+                'states': {state: stats['states'][state] for state in sorted(stats['states'])},
+                'categories': {category: stats['categories'][category] for category in sorted(stats['categories'])}
+            }
+            for entity, stats in total['entity_stats'].items()
+        },
+        'parse_errors': metadata.get('parse_errors', [])
+    }
+
+def window_summary(name, total, results):
+    # dataset summary out of the merged counters, interaction pairs ordered like the analyzer groupby
+    entity_order = {entity: i for i, entity in enumerate(results['entity_stats'])}
+    pair_frames = {pair: total['interactions'][pair]
+                   for pair in sorted(total['interactions'], key=lambda pair: (entity_order[pair[0]], pair[1]))}
+    return build_summary(name, results, pair_frames, total['box_size_counts'])
+
+def process_windowed_dataset(xml_path, json_path, output_dir, name, window_frames, join_engine='aligned',
+                             interpolate=False, export=None, export_root=None, summary=False):
+    # stats mode outputs (results.json, frame table, exports, summary) built window by window
+    # the frame table is not cached, keyframes and intervals are the only whole video tables in memory
+    bbox_df, intervals_df, metadata = read_annotations(xml_path, json_path)
+    total = empty_window_stats()
+    
+    if export_root is not None:
+        remove_video_partitions(export_root, name)
+        write_partitions(intervals_df, partition_dir(Path(export_root) / 'intervals', 'video', name), export, 'entity')
+    if export:
+        write_table(intervals_df, Path(output_dir) / "intervals", export)
+    
+    writer = TableWriter(Path(output_dir) / "frame_table", export) if export else frame_table_writer(output_dir)
+    with writer:
+        windows = frame_table_windows(bbox_df, intervals_df, metadata, window_frames, join_engine, interpolate)
+        for part, ((first_frame, last_frame), window_df) in enumerate(windows):
+            logger.debug("Window frames %d-%d: %d rows", first_frame, last_frame, len(window_df))
+            with span('window_stats', first_frame=first_frame):
+                merge_window_stats(total, window_stats(window_df, metadata))
+            with span('window_write', first_frame=first_frame):
+                writer.write(window_df)
+                if export_root is not None:
+                    write_partitions(window_df, partition_dir(Path(export_root) / 'frames', 'video', name),
+                                     export, 'entity', part)
+    
+    results = window_results(total, metadata)
+    if summary:
+        with span('summary'):
+            write_summary(window_summary(name, total, results), output_dir)
+    return write_results(results, output_dir), results